@@ -17,29 +17,26 @@ Options:
 """
 
 import os
-import threading
 import sys
-import shutil
 import subprocess
 import random
-import ipaddress
 import socket
+import ssl
+import struct
 import time
 import json
 import argparse
+import http.client
+import ctypes
 import re
+import select
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from urllib.parse import urlparse
-from scapy.config import conf
-from scapy.all import sniff, sr1, send, Raw
-from scapy.layers.inet import IP, UDP
-from scapy.contrib.ospf import OSPF_Hdr, OSPF_Hello
-from scapy.layers.l2 import Ether
-from scapy.layers.dhcp import BOOTP, DHCP
-
-# Import dhcppython for improved DHCP testing
-import dhcppython.client as dhcp_client
-import dhcppython.options as dhcp_options
-import dhcppython.utils as dhcp_utils
+
+# Scapy and dhcppython are imported lazily in the functions that use them,
+# since importing them costs noticeable startup time.
 
 # Constants for Nile Connect tests
 NILE_HOSTNAME = "ne-u1.nile-global.cloud"
@@ -47,11 +44,68 @@ S3_HOSTNAME = "s3.us-west-2.amazonaws.com"
 GUEST_IPS = ["145.40.90.203","145.40.64.129","145.40.113.105","147.28.179.61"]
 UDP_PORT = 6081
 SSL_PORT = 443
+NTP_PORT = 123
+
+# HTTPS test URLs, split into host, port and path once at import
+NILE_URL = urlparse(f'https://{NILE_HOSTNAME}')
+S3_URL = urlparse(f'https://{S3_HOSTNAME}/nile-prod-us-west-2')
+NILESECURE_URL = urlparse('https://u1.nilesecure.com')
+
+# Seconds between the NTP epoch (1900) and the Unix epoch (1970)
+NTP_EPOCH_OFFSET = 2208988800
+
+# Hostname of this test host, sent in the DHCP hostname option
+LOCAL_HOSTNAME = socket.gethostname()
+
+# Linux socket option for attaching BPF filters (not exported by the socket module)
+SO_ATTACH_FILTER = 26
+
+# Pre-assembled classic BPF program for "ip proto 89" on Ethernet frames, so
+# the kernel drops everything but OSPF before it reaches Python:
+#   ldh [12]; jeq #0x800; ldb [23]; jeq #89; ret #0xffff; ret #0
+OSPF_BPF_FILTER = b''.join(struct.pack('HBBI', *ins) for ins in (
+    (0x28, 0, 0, 12),
+    (0x15, 0, 3, 0x0800),
+    (0x30, 0, 0, 23),
+    (0x15, 0, 1, 89),
+    (0x06, 0, 0, 0xFFFF),
+    (0x06, 0, 0, 0),
+))
+
+# Pre-assembled classic BPF program for "udp and (port 67 or port 68)" on
+# IPv4 Ethernet frames, skipping non-first fragments
+DHCP_BPF_FILTER = b''.join(struct.pack('HBBI', *ins) for ins in (
+    (0x28, 0, 0, 12),         # ldh [12]
+    (0x15, 0, 12, 0x0800),    # jeq #0x800 (IPv4)
+    (0x30, 0, 0, 23),         # ldb [23]
+    (0x15, 0, 10, 17),        # jeq #17 (UDP)
+    (0x28, 0, 0, 20),         # ldh [20]
+    (0x45, 8, 0, 0x1FFF),     # jset #0x1fff (fragment offset)
+    (0xB1, 0, 0, 14),         # ldxb 4*([14]&0xf)
+    (0x48, 0, 0, 14),         # ldh [x+14] (source port)
+    (0x15, 4, 0, 67),
+    (0x15, 3, 0, 68),
+    (0x48, 0, 0, 16),         # ldh [x+16] (destination port)
+    (0x15, 1, 0, 67),
+    (0x15, 0, 1, 68),
+    (0x06, 0, 0, 0xFFFF),     # accept
+    (0x06, 0, 0, 0),          # drop
+))
+
+# rtnetlink constants used to watch for link state changes
+RTMGRP_LINK = 0x1
+RTM_NEWLINK = 16
+IFLA_OPERSTATE = 16
+IF_OPER_UP = 6
 
-# Check UDP connectivity using netcat
-def check_udp_connectivity_netcat(ip: str, port: int = UDP_PORT, timeout: int = 5) -> bool:
+# Check UDP connectivity with a connected UDP socket
+def check_udp_connectivity(ip: str, port: int = UDP_PORT, timeout: int = 5) -> bool:
     """
-    Check UDP connectivity using netcat (nc -vzu) with a timeout.
+    Check UDP connectivity by sending a probe datagram from a connected UDP socket.
+    
+    Connecting the socket makes the kernel report ICMP port/host unreachable
+    errors back to it, so a refused probe surfaces as an error on recv. As with
+    netcat's -zu mode, no error within the timeout is treated as open.
     
     Args:
         ip: IP address to check
@@ -62,65 +116,93 @@ def check_udp_connectivity_netcat(ip: str, port: int = UDP_PORT, timeout: int =
         bool: True if connectivity successful, False otherwise
     """
     try:
-        result = subprocess.run(
-            ['nc', '-vzu', ip, str(port)],
-            capture_output=True,
-            text=True,
-            timeout=timeout
-        )
-        
-        # Check for success indicators in output
-        if "open" in result.stderr.lower():
-            return True
-            
-        if result.returncode == 0:
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            sock.connect((ip, port))
+            sock.send(b'X')
+            readable, _, _ = select.select([sock], [], [], timeout)
+            if readable:
+                # Raises ConnectionRefusedError if an ICMP unreachable came back
+                sock.recv(1024)
             return True
-            
-        return False
-    except subprocess.TimeoutExpired:
-        return False
-    except FileNotFoundError:
-        print(f"  Error: netcat (nc) command not found. Please install netcat.")
+    except ConnectionRefusedError:
         return False
     except Exception as e:
         print(f"  Error: {e}")
         return False
 
-# Check SSL certificate
-def check_ssl_certificate(ip: str, hostname: str, expected_org: str) -> bool:
+# Shared TLS context for certificate checks. Certificate verification stays on
+# because getpeercert() only returns the parsed issuer for verified peers.
+SSL_CONTEXT = ssl.create_default_context()
+
+# Browser-like request headers sent by every HTTPS check
+HTTPS_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.5',
+    'Connection': 'close',
+}
+
+# HTTPS reachability, status and certificate check over one connection
+def https_check(src_ip, url, expected_org=None, timeout=10):
     """
-    Test SSL certificate validity and organization.
+    Connect to an HTTPS URL from a source IP and check reachability, HTTP status and certificate.
+    
+    A single TCP connection and TLS handshake is used for all three results:
+    the certificate is verified during the handshake, its issuer is checked
+    against the expected organization, and one GET request is sent to read
+    the HTTP status line.
     
     Args:
-        ip: IP address to check
-        hostname: Hostname for SNI
-        expected_org: Expected organization in certificate issuer
+        src_ip: Source IP address to connect from
+        url: Parsed HTTPS URL to request (result of urlparse(), e.g. NILE_URL)
+        expected_org: Expected organization in certificate issuer (None to only verify the certificate)
+        timeout: Connection timeout in seconds (default: 10)
         
     Returns:
-        bool: True if SSL certificate is valid and contains expected organization, False otherwise
+        dict: connected (TCP connection established), cert_ok (certificate valid and
+        issued by expected_org), status (HTTP status code string, '' if none) and error
     """
-    try:
-        result = subprocess.run(
-            ['openssl', 's_client', '-connect', f'{ip}:{SSL_PORT}', '-servername', hostname],
-            capture_output=True,
-            text=True
-        )
-        
-        if "issuer=" in result.stdout:
-            issuer_start = result.stdout.find("issuer=")
-            issuer_end = result.stdout.find("\n", issuer_start)
-            issuer = result.stdout[issuer_start:issuer_end].strip()
-            
-            # Check if issuer contains the expected organization
-            if expected_org not in issuer:
-                return False
+    result = {'connected': False, 'cert_ok': False, 'status': '', 'error': None}
+    host, port = url.hostname, url.port or SSL_PORT
+    
+    addrs = resolve_a(host)
+    if not addrs:
+        result['error'] = f'could not resolve {host}'
+        return result
+    raw = None
+    for addr in addrs:
+        try:
+            raw = socket.create_connection((addr, port), timeout=timeout, source_address=(src_ip, 0))
+            break
+        except OSError as e:
+            result['error'] = e
+    if raw is None:
+        return result
+    result['connected'] = True
+    
+    with raw:
+        try:
+            with SSL_CONTEXT.wrap_socket(raw, server_hostname=host) as sock:
+                cert = sock.getpeercert()
+                # Check if any issuer organizationName contains the expected organization,
+                # stopping at the first match
+                result['cert_ok'] = expected_org is None or any(
+                    key == 'organizationName' and expected_org in value
+                    for rdn in cert.get('issuer', ()) for key, value in rdn)
                 
-            return True
-        else:
-            return False
-    except Exception as e:
-        print(f"  Error: {e}")
-        return False
+                # Send the request with http.client over the already verified
+                # connection instead of letting it open a new one
+                conn = http.client.HTTPSConnection(host, port, timeout=timeout, context=SSL_CONTEXT)
+                conn.sock = sock
+                conn.request('GET', url.path or '/', headers=HTTPS_HEADERS)
+                result['status'] = str(conn.getresponse().status)
+        except (ssl.SSLError, ssl.CertificateError) as e:
+            if DEBUG:
+                print(f"  SSL error for {host} from {src_ip}: {e}")
+            result['error'] = e
+        except (OSError, http.client.HTTPException) as e:
+            result['error'] = e
+    return result
 
 
 
@@ -135,6 +217,8 @@ def parse_args():
     parser = argparse.ArgumentParser(description='Nile Readiness Test')
     parser.add_argument('--debug', action='store_true', help='Enable debug output')
     parser.add_argument('--config', type=str, help='Path to JSON configuration file')
+    parser.add_argument('--ospf-stabilize-seconds', type=float, default=0,
+                        help='Extra seconds to wait after OSPF reaches Full/DR (default: 0)')
     return parser.parse_args()
 
 # Read configuration from JSON file
@@ -160,6 +244,23 @@ def read_config(config_file):
         print(f"Error reading config file {config_file}: {e}")
         sys.exit(1)
 
+# Config file fields that must be present and non-empty
+REQUIRED_CONFIG_FIELDS = ('ip_address', 'netmask', 'gateway', 'nsb_subnet', 'sensor_subnet', 'client_subnet')
+REQUIRED_RADIUS_FIELDS = ('radius_servers', 'radius_secret', 'radius_username', 'radius_password')
+
+def missing_fields(config, fields):
+    """
+    Get the configuration fields that are absent or empty.
+    
+    Args:
+        config: Parsed configuration data
+        fields: Field names to check
+        
+    Returns:
+        list: Names of the missing fields
+    """
+    return [field for field in fields if not config.get(field)]
+
 # Parse arguments
 args = parse_args()
 DEBUG = args.debug
@@ -169,24 +270,31 @@ GREEN = '\033[32m'
 RED   = '\033[31m'
 RESET = '\033[0m'
 
+# Pre-colored result labels
+OK_LABEL   = f'{GREEN}Success{RESET}'
+FAIL_LABEL = f'{RED}Fail{RESET}'
+
 # Pre-flight checks
 required_bins = {
     'vtysh': 'FRR (vtysh)',
     'radclient': 'FreeRADIUS client (radclient)',
-    'dig': 'DNS lookup utility (dig)',
-    'ntpdate': 'NTP utility (ntpdate)',
-    'curl': 'HTTPS test utility (curl)',
-    'nc': 'Netcat (nc) for UDP connectivity testing',
-    'openssl': 'OpenSSL for SSL certificate verification'
+    'dig': 'DNS lookup utility (dig)'
 }
-missing = [name for name in required_bins if shutil.which(name) is None]
+# List each PATH directory once instead of stat-ing every directory per binary
+available_bins = set()
+for path_dir in os.environ.get('PATH', os.defpath).split(os.pathsep):
+    try:
+        available_bins.update(os.listdir(path_dir))
+    except OSError:
+        pass
+missing = [name for name in required_bins if name not in available_bins]
 if missing:
     print('Error: the following required tools are missing:')
     for name in missing:
         print(f'  - {required_bins[name]}')
     print()
     print('Please install them, e.g.:')
-    print('  sudo apt update && sudo apt install frr freeradius-client dnsutils ntpdate curl netcat-openbsd openssl')
+    print('  sudo apt update && sudo apt install frr freeradius-client dnsutils')
     sys.exit(1)
 
 # Wrapper for subprocess.run with debug
@@ -196,7 +304,7 @@ def run_cmd(cmd, **kwargs):
     
     This function wraps subprocess.run with additional features:
     - Debug output of commands being executed
-    - Improved handling of stdout/stderr to avoid buffer deadlocks
+    - Handling of stdout/stderr via communicate() to avoid buffer deadlocks
     - Consistent error handling
     
     Args:
@@ -210,49 +318,25 @@ def run_cmd(cmd, **kwargs):
         printed = cmd if isinstance(cmd, str) else ' '.join(cmd)
         print(f'DEBUG: Running: {printed} | kwargs={kwargs}')
     
-    # Use Popen instead of subprocess.run to avoid buffer deadlocks
+    # Use Popen.communicate to drain stdout and stderr without buffer deadlocks
     if kwargs.get('capture_output'):
         # Create pipes for stdout and stderr
         process = subprocess.Popen(
             cmd,
+            stdin=subprocess.PIPE if kwargs.get('input') is not None else None,
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
             text=kwargs.get('text', False),
             shell=kwargs.get('shell', False)
         )
         
-        # Read stdout and stderr incrementally to avoid buffer deadlocks
-        stdout_data = []
-        stderr_data = []
-        
-        while True:
-            # Read from stdout and stderr without blocking
-            stdout_chunk = process.stdout.read(1024)
-            stderr_chunk = process.stderr.read(1024)
-            
-            # If we got data, store it
-            if stdout_chunk:
-                stdout_data.append(stdout_chunk)
-            if stderr_chunk:
-                stderr_data.append(stderr_chunk)
-            
-            # Check if process has finished
-            if process.poll() is not None:
-                # Read any remaining data
-                stdout_chunk = process.stdout.read()
-                stderr_chunk = process.stderr.read()
-                if stdout_chunk:
-                    stdout_data.append(stdout_chunk)
-                if stderr_chunk:
-                    stderr_data.append(stderr_chunk)
-                break
-            
-            # Small sleep to avoid CPU spinning
-            time.sleep(0.01)
-        
-        # Join the data
-        stdout_output = ''.join(stdout_data) if kwargs.get('text', False) else b''.join(stdout_data)
-        stderr_output = ''.join(stderr_data) if kwargs.get('text', False) else b''.join(stderr_data)
+        try:
+            stdout_output, stderr_output = process.communicate(input=kwargs.get('input'), timeout=kwargs.get('timeout'))
+        except subprocess.TimeoutExpired:
+            process.kill()
+            stdout_output, stderr_output = process.communicate()
+            if DEBUG:
+                print(f'DEBUG: Command timed out after {kwargs.get("timeout")}s')
         
         # Create a CompletedProcess object to match subprocess.run's return value
         proc = subprocess.CompletedProcess(
@@ -263,10 +347,11 @@ def run_cmd(cmd, **kwargs):
         )
         
         if DEBUG:
+            # Output is usually captured as bytes; decode only for printing
             print('DEBUG: stdout:')
-            print(proc.stdout)
+            print(proc.stdout.decode(errors='replace') if isinstance(proc.stdout, bytes) else proc.stdout)
             print('DEBUG: stderr:')
-            print(proc.stderr)
+            print(proc.stderr.decode(errors='replace') if isinstance(proc.stderr, bytes) else proc.stderr)
     else:
         # If we're not capturing output, just use subprocess.run
         proc = subprocess.run(cmd, **kwargs)
@@ -278,6 +363,54 @@ def run_cmd(cmd, **kwargs):
     
     return proc
 
+# Run a command whose output is not needed
+def run_cmd_silent(cmd, **kwargs):
+    """
+    Execute a command for its exit status only, discarding its output.
+    
+    Output goes to /dev/null instead of being piped and buffered; in debug
+    mode it is still captured so run_cmd can print it.
+    
+    Args:
+        cmd: Command to execute (list or string)
+        **kwargs: Additional arguments to pass to run_cmd
+        
+    Returns:
+        int: The command's return code
+    """
+    if DEBUG:
+        return run_cmd(cmd, capture_output=True, **kwargs).returncode
+    return run_cmd(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, **kwargs).returncode
+
+# Run several ip commands in one process
+def ip_batch(commands, check=False, **kwargs):
+    """
+    Run several ip commands through a single `ip -force -batch -` process.
+    
+    -force keeps ip processing the remaining commands when one fails; ip
+    still exits non-zero if any of them failed. Output is captured so the
+    caller can report stderr.
+    
+    Args:
+        commands: ip commands without the leading 'ip' (e.g. 'link set dev eth0 up')
+        check: Raise CalledProcessError if any command in the batch failed
+        **kwargs: Additional arguments to pass to run_cmd
+        
+    Returns:
+        subprocess.CompletedProcess: Result of the batch, or None if there was nothing to run
+        
+    Raises:
+        subprocess.CalledProcessError: If check is True and the batch failed
+    """
+    if not commands:
+        return None
+    batch = ''.join(f'{command}\n' for command in commands).encode()
+    cmd = ['ip', '-force', '-batch', '-']
+    proc = run_cmd(cmd, input=batch, check=False, capture_output=True, **kwargs)
+    if check and proc.returncode != 0:
+        raise subprocess.CalledProcessError(proc.returncode, cmd, proc.stdout, proc.stderr)
+    return proc
+
 # Prompt helper
 def prompt_nonempty(prompt):
     """
@@ -337,34 +470,14 @@ def get_user_input(config_file=None):
         custom_ntp_servers = config.get('custom_ntp_servers', []) if run_custom_ntp_tests else []
         
         # Validate required fields
-        missing = []
-        for field, value in [
-            ('ip_address', ip_addr),
-            ('netmask', netmask),
-            ('gateway', gateway),
-            ('nsb_subnet', mgmt1),
-            ('sensor_subnet', mgmt2),
-            ('client_subnet', client_subnet)
-        ]:
-            if not value:
-                missing.append(field)
-        
+        missing = missing_fields(config, REQUIRED_CONFIG_FIELDS)
         if missing:
             print(f"Error: Missing required fields in config file: {', '.join(missing)}")
             sys.exit(1)
             
         # Validate RADIUS fields if RADIUS tests are enabled
         if run_radius:
-            missing = []
-            for field, value in [
-                ('radius_servers', radius_servers),
-                ('radius_secret', secret),
-                ('radius_username', username),
-                ('radius_password', password)
-            ]:
-                if not value:
-                    missing.append(field)
-            
+            missing = missing_fields(config, REQUIRED_RADIUS_FIELDS)
             if missing:
                 print(f"Error: RADIUS tests enabled but missing fields: {', '.join(missing)}")
                 sys.exit(1)
@@ -452,6 +565,44 @@ def get_user_input(config_file=None):
             dhcp_servers, radius_servers, secret, username, password,
             run_dhcp, run_radius, custom_dns_servers, custom_ntp_servers)
 
+# Replace a file's contents atomically
+def atomic_write(path, data):
+    """
+    Write bytes to a file via a temporary file and os.replace().
+    
+    An interrupted write leaves the original file intact instead of a
+    truncated one. Symlinks (e.g. a systemd-resolved /etc/resolv.conf) are
+    followed so the link itself is preserved, and the original file's mode
+    and ownership (e.g. frr:frr on /etc/frr/daemons) are kept.
+    
+    Args:
+        path: The file to write
+        data: The bytes to write
+    """
+    path = os.path.realpath(path)
+    tmp = f'{path}.nrt-tmp'
+    try:
+        with open(tmp, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        try:
+            st = os.stat(path)
+            os.chown(tmp, st.st_uid, st.st_gid)
+            os.chmod(tmp, st.st_mode & 0o7777)
+        except OSError:
+            pass
+        os.replace(tmp, path)
+    except OSError:
+        # Some files cannot be renamed over (e.g. a bind-mounted resolv.conf),
+        # so fall back to writing in place
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        with open(path, 'wb') as f:
+            f.write(data)
+
 # Record/restore host state
 def record_state(iface):
     """
@@ -470,13 +621,14 @@ def record_state(iface):
     if DEBUG:
         print(f"Recording state of interface {iface}...")
     state = {}
-    out = run_cmd(['ip','addr','show','dev',iface], capture_output=True, text=True).stdout
-    state['addrs']  = [l.split()[1] for l in out.splitlines() if 'inet ' in l]
-    state['routes'] = run_cmd(['ip','route','show','default'], capture_output=True, text=True).stdout.splitlines()
-    with open('/etc/frr/daemons') as f: state['daemons'] = f.read()
-    with open('/etc/resolv.conf') as f: state['resolv'] = f.read()
-    svc = run_cmd(['systemctl','is-enabled','frr'], capture_output=True, text=True)
-    state['frr_enabled'] = (svc.returncode == 0)
+    info = get_iface_info(iface)
+    state['addrs']  = [f"{a['local']}/{a['prefixlen']}" for a in info.get('addr_info', []) if a.get('family') == 'inet']
+    state['routes'] = get_default_routes()
+    # Keep the files as raw bytes so they are restored exactly, without decoding
+    with open('/etc/frr/daemons','rb') as f: state['daemons'] = f.read()
+    with open('/etc/resolv.conf','rb') as f: state['resolv'] = f.read()
+    # Same answer as `systemctl is-enabled frr` for a WantedBy=multi-user.target unit, without the fork
+    state['frr_enabled'] = os.path.exists('/etc/systemd/system/multi-user.target.wants/frr.service')
     return state
 
 def restore_state(iface, state):
@@ -498,16 +650,10 @@ def restore_state(iface, state):
     if DEBUG:
         print('\nRestoring original state...')
     
-    # First, remove dummy interfaces
-    if DEBUG:
-        print("Removing dummy interfaces...")
-    for name in ('mgmt1','mgmt2','client'):
-        run_cmd(['ip','link','delete',f'dummy_{name}'], check=False, capture_output=True)
-    
-    # Flush the interface
-    if DEBUG:
-        print(f"Flushing interface {iface}...")
-    run_cmd(['ip','addr','flush','dev',iface], check=True, capture_output=True)
+    # Remove dummy interfaces, then put back the original addresses and
+    # flush default routes, all in one ip batch
+    commands = [f'link delete dummy_{name}' for name in ('mgmt1','mgmt2','client')]
+    commands.append(f'addr flush dev {iface}')
     
     # Apply a temporary IP configuration if there are no addresses in the state
     # This helps with the "Nexthop has invalid gateway" error
@@ -515,35 +661,29 @@ def restore_state(iface, state):
     if not state['addrs']:
         if DEBUG:
             print("No original addresses found, applying temporary IP configuration...")
-        run_cmd(['ip','addr','add','0.0.0.0/0','dev',iface], check=False, capture_output=True)
-        run_cmd(['ip','link','set','dev',iface,'up'], check=False, capture_output=True)
+        commands.append(f'addr add 0.0.0.0/0 dev {iface}')
     
-    # Add back the original addresses
-    if DEBUG:
-        print("Restoring original IP addresses...")
-    for addr in state['addrs']:
-        run_cmd(['ip','addr','add',addr,'dev',iface], check=False, capture_output=True)
+    commands.extend(f'addr add {addr} dev {iface}' for addr in state['addrs'])
+    commands.append(f'link set dev {iface} up')
+    commands.append('route flush default')
     
-    # Make sure the interface is up
     if DEBUG:
-        print(f"Ensuring interface {iface} is up...")
-    run_cmd(['ip','link','set','dev',iface,'up'], check=False, capture_output=True)
-    
-    # Flush default routes
-    if DEBUG:
-        print("Flushing default routes...")
-    run_cmd(['ip','route','flush','default'], check=False, capture_output=True)
+        print(f"Removing dummy interfaces, restoring addresses on {iface} and flushing default routes...")
+    proc = ip_batch(commands)
+    if proc.returncode != 0:
+        print(f"WARNING: Restoring interfaces on {iface} reported errors; the host may need manual cleanup:")
+        print(proc.stderr.decode(errors='replace').strip())
     
     # Restore FRR configuration
     if DEBUG:
         print("Restoring FRR configuration...")
-    with open('/etc/frr/daemons','w') as f: f.write(state['daemons'])
+    atomic_write('/etc/frr/daemons', state['daemons'])
     run_cmd(['rm','-f','/etc/frr/frr.conf'], check=False, capture_output=True)
     
     # Restore DNS configuration
     if DEBUG:
         print("Restoring DNS configuration...")
-    with open('/etc/resolv.conf','w') as f: f.write(state['resolv'])
+    atomic_write('/etc/resolv.conf', state['resolv'])
     
     # Stop and disable FRR
     if DEBUG:
@@ -554,6 +694,242 @@ def restore_state(iface, state):
     if DEBUG:
         print('Removed FRR config, stopped service, restored DNS.')
 
+# Netmask helper
+def netmask_to_prefix(netmask):
+    """
+    Convert a dotted decimal netmask to a prefix length.
+    
+    Args:
+        netmask: The netmask in dotted decimal notation (e.g., 255.255.255.0)
+                 or as a prefix length (e.g., 24)
+        
+    Returns:
+        int: The prefix length (e.g., 24)
+        
+    Raises:
+        ValueError: If the netmask is not a valid contiguous netmask or prefix length
+    """
+    if netmask.isdigit():
+        if int(netmask) <= 32:
+            return int(netmask)
+        raise ValueError(f'{netmask!r} is not a valid netmask')
+    try:
+        packed = socket.inet_aton(netmask)
+    except OSError:
+        packed = None
+    # inet_aton also takes short, octal and hex forms; accept only dotted quads
+    if packed is None or socket.inet_ntoa(packed) != netmask:
+        raise ValueError(f'{netmask!r} is not a valid netmask')
+    m = struct.unpack('!I', packed)[0]
+    # A contiguous mask has its inverted host bits forming 2**n - 1
+    host = ~m & 0xFFFFFFFF
+    if host & (host + 1):
+        raise ValueError(f'{netmask!r} is not a valid netmask')
+    return 32 - host.bit_length()
+
+# Subnet helpers, cached since the same subnets are resolved during setup and tests
+@lru_cache(maxsize=None)
+def parse_subnet(subnet):
+    """
+    Parse a subnet in CIDR notation, as strictly as ipaddress.IPv4Network().
+    
+    Args:
+        subnet: Subnet in CIDR notation (e.g., 192.168.1.0/24); a missing prefix means /32
+        
+    Returns:
+        tuple: (network_address, prefix_length), e.g. ('192.168.1.0', 24)
+        
+    Raises:
+        ValueError: If the address or prefix is invalid or host bits are set
+    """
+    net_part, sep, prefix = subnet.partition('/')
+    prefix = netmask_to_prefix(prefix) if sep else 32
+    try:
+        packed = socket.inet_aton(net_part)
+    except OSError:
+        packed = None
+    # inet_aton also takes short, octal and hex forms; accept only dotted quads
+    if packed is None or socket.inet_ntoa(packed) != net_part:
+        raise ValueError(f'{subnet!r} does not appear to be an IPv4 network')
+    net_int = struct.unpack('!I', packed)[0]
+    mask = (0xFFFFFFFF << (32 - prefix)) & 0xFFFFFFFF
+    if net_int & ~mask & 0xFFFFFFFF:
+        raise ValueError(f'{subnet!r} has host bits set')
+    return socket.inet_ntoa(struct.pack('!I', net_int)), prefix
+
+def subnet_first_host(subnet):
+    """
+    Get the first host address and prefix length of a subnet in CIDR notation.
+    
+    Args:
+        subnet: Subnet in CIDR notation (e.g., 192.168.1.0/24)
+        
+    Returns:
+        tuple: (first_host_ip, prefix_length), e.g. ('192.168.1.1', 24)
+        
+    Raises:
+        ValueError: If the subnet is invalid (see parse_subnet)
+    """
+    net_part, prefix = parse_subnet(subnet)
+    net_int = struct.unpack('!I', socket.inet_aton(net_part))[0]
+    return socket.inet_ntoa(struct.pack('!I', net_int + 1)), prefix
+
+# Interface status helpers
+
+def get_links():
+    """
+    Get all network interfaces from a single `ip -j link show` call.
+    
+    Returns:
+        dict: Link information keyed by interface name
+    """
+    out = run_cmd(['ip', '-j', 'link', 'show'], capture_output=True).stdout
+    try:
+        links = json.loads(out)
+    except ValueError:
+        links = []
+    return {link['ifname']: link for link in links}
+
+def get_default_routes():
+    """
+    Get the default routes from a single `ip -j route show default` call.
+    
+    Returns:
+        list: Route dictionaries (gateway, dev, metric, ...), empty if unavailable
+    """
+    out = run_cmd(['ip', '-j', 'route', 'show', 'default'], capture_output=True).stdout
+    try:
+        return json.loads(out)
+    except ValueError:
+        return []
+
+def get_iface_info(iface):
+    """
+    Get link state and addresses of an interface from one `ip -j addr show` call.
+    
+    Args:
+        iface: The network interface to query
+        
+    Returns:
+        dict: Interface information (operstate, addr_info, ...), empty if unavailable
+    """
+    out = run_cmd(['ip', '-j', 'addr', 'show', 'dev', iface], capture_output=True).stdout
+    try:
+        info = json.loads(out)
+    except ValueError:
+        info = []
+    return info[0] if info else {}
+
+def link_is_up(iface):
+    """
+    Check whether an interface is operationally up.
+    
+    Args:
+        iface: The network interface to check
+        
+    Returns:
+        bool: True if sysfs reports the interface operstate as up
+    """
+    try:
+        with open(f'/sys/class/net/{iface}/operstate') as f:
+            return f.read().strip() == 'up'
+    except OSError:
+        return False
+
+def iface_mac(iface):
+    """
+    Get the MAC address of an interface.
+    
+    Args:
+        iface: The network interface to query
+        
+    Returns:
+        str: The MAC address (aa:bb:cc:dd:ee:ff), or None if unavailable
+    """
+    try:
+        with open(f'/sys/class/net/{iface}/address') as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+def iface_has_addr(info, ip_addr):
+    """
+    Check whether interface information returned by get_iface_info() includes an IPv4 address.
+    
+    Args:
+        info: Interface information dictionary
+        ip_addr: The IP address to look for
+        
+    Returns:
+        bool: True if the address is configured on the interface
+    """
+    return any(a.get('family') == 'inet' and a.get('local') == ip_addr
+               for a in info.get('addr_info', []))
+
+def wait_for_link_up(iface, timeout):
+    """
+    Wait for an interface to become operationally up.
+    
+    Subscribes to rtnetlink link notifications and returns as soon as the
+    kernel reports IF_OPER_UP for the interface, instead of polling.
+    
+    Args:
+        iface: The network interface to wait for
+        timeout: Maximum time to wait in seconds
+        
+    Returns:
+        bool: True if the interface is up, False if the timeout expired
+    """
+    try:
+        ifindex = socket.if_nametoindex(iface)
+    except OSError:
+        return False
+    
+    with socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, socket.NETLINK_ROUTE) as nl:
+        nl.bind((0, RTMGRP_LINK))
+        
+        # Check the current state only after subscribing so no event is missed
+        if link_is_up(iface):
+            return True
+        
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            readable, _, _ = select.select([nl], [], [], remaining)
+            if not readable:
+                return False
+            data = nl.recv(65535)
+            
+            # Walk the nlmsghdr/ifinfomsg/rtattr structures
+            offset = 0
+            while offset + 16 <= len(data):
+                msg_len, msg_type = struct.unpack_from('IH', data, offset)
+                if msg_len < 16:
+                    break
+                if msg_type == RTM_NEWLINK:
+                    index = struct.unpack_from('BxHiII', data, offset + 16)[2]
+                    if index == ifindex:
+                        attr = offset + 32
+                        while attr + 4 <= offset + msg_len:
+                            rta_len, rta_type = struct.unpack_from('HH', data, attr)
+                            if rta_len < 4:
+                                break
+                            if rta_type == IFLA_OPERSTATE and data[attr + 4] == IF_OPER_UP:
+                                return True
+                            attr += (rta_len + 3) & ~3
+                offset += (msg_len + 3) & ~3
+
+def set_links_down(interfaces):
+    """
+    Bring several interfaces down with a single `ip -batch` process.
+    
+    Args:
+        interfaces: Names of the interfaces to bring down
+    """
+    ip_batch([f'link set dev {interface} down' for interface in interfaces])
+
 # Configure main interface
 def configure_interface(iface, ip_addr, netmask, mgmt_interface='end0'):
     """
@@ -580,13 +956,7 @@ def configure_interface(iface, ip_addr, netmask, mgmt_interface='end0'):
     # Get a list of all network interfaces
     if DEBUG:
         print("Getting list of network interfaces...")
-    interfaces_output = run_cmd(['ip', 'link', 'show'], capture_output=True, text=True).stdout
-    interfaces = []
-    for line in interfaces_output.splitlines():
-        if ': ' in line:
-            # Extract interface name (remove number and colon)
-            interface_name = line.split(': ')[1].split('@')[0]
-            interfaces.append(interface_name)
+    interfaces = list(get_links())
     
     # Check for and clean up dummy interfaces from previous runs
     if DEBUG:
@@ -602,8 +972,8 @@ def configure_interface(iface, ip_addr, netmask, mgmt_interface='end0'):
     if mgmt_interface in interfaces and mgmt_interface != iface:
         if DEBUG:
             print(f"Checking if management interface {mgmt_interface} has a default gateway...")
-        route_output = run_cmd(['ip', 'route', 'show', 'dev', mgmt_interface], capture_output=True, text=True).stdout
-        if 'default' in route_output:
+        route_output = run_cmd(['ip', 'route', 'show', 'dev', mgmt_interface], capture_output=True).stdout
+        if b'default' in route_output:
             if DEBUG:
                 print(f"Removing default gateway from management interface {mgmt_interface}...")
             run_cmd(['ip', 'route', 'del', 'default', 'dev', mgmt_interface], check=False)
@@ -617,25 +987,24 @@ def configure_interface(iface, ip_addr, netmask, mgmt_interface='end0'):
                             if interface != 'lo' and interface != mgmt_interface and not interface.startswith('dummy_')]
     
     # First attempt to disable all interfaces
-    for interface in interfaces_to_disable:
-        if DEBUG:
-            print(f"Disabling interface {interface}...")
-        run_cmd(['ip', 'link', 'set', 'dev', interface, 'down'], check=False)
+    if DEBUG:
+        print(f"Disabling interfaces {', '.join(interfaces_to_disable)}...")
+    set_links_down(interfaces_to_disable)
     
     # Verify interfaces are actually down and retry if needed
     if DEBUG:
         print("Verifying interfaces are down...")
     max_attempts = 3
     for attempt in range(max_attempts):
-        all_down = True
-        interfaces_output = run_cmd(['ip', 'link', 'show'], capture_output=True, text=True).stdout
-        for interface in interfaces_to_disable:
-            # Check if interface is still up
-            if f"{interface}: " in interfaces_output and "state UP" in interfaces_output.split(f"{interface}: ")[1].split("\n")[0]:
-                if DEBUG:
-                    print(f"Interface {interface} is still up, retrying...")
-                run_cmd(['ip', 'link', 'set', 'dev', interface, 'down'], check=False)
-                all_down = False
+        links = get_links()
+        # Check which interfaces are still up
+        still_up = [interface for interface in interfaces_to_disable
+                    if links.get(interface, {}).get('operstate') == 'UP']
+        all_down = not still_up
+        if still_up:
+            if DEBUG:
+                print(f"Interfaces {', '.join(still_up)} still up, retrying...")
+            set_links_down(still_up)
         
         if all_down:
             if DEBUG:
@@ -650,7 +1019,7 @@ def configure_interface(iface, ip_addr, netmask, mgmt_interface='end0'):
     # Configure the specified interface
     if DEBUG:
         print(f'Configuring {iface}...')
-    prefix = ipaddress.IPv4Network(f'0.0.0.0/{netmask}').prefixlen
+    prefix = netmask_to_prefix(netmask)
     
     # Then flush and configure
     if DEBUG:
@@ -671,11 +1040,12 @@ def configure_interface(iface, ip_addr, netmask, mgmt_interface='end0'):
     interface_up = False
     
     for attempt in range(max_retries):
-        # Check if interface is up
-        iface_status = run_cmd(['ip', 'link', 'show', 'dev', iface], capture_output=True, text=True).stdout
-        iface_addr = run_cmd(['ip', 'addr', 'show', 'dev', iface], capture_output=True, text=True).stdout
+        # Check if interface is up and has its address
+        info = get_iface_info(iface)
+        is_up = info.get('operstate') == 'UP'
+        has_addr = iface_has_addr(info, ip_addr)
         
-        if "state UP" in iface_status and f"inet {ip_addr}" in iface_addr:
+        if is_up and has_addr:
             if DEBUG:
                 print(f"Interface {iface} is up and properly configured with IP {ip_addr}")
             interface_up = True
@@ -683,20 +1053,20 @@ def configure_interface(iface, ip_addr, netmask, mgmt_interface='end0'):
         else:
             if DEBUG:
                 print(f"Attempt {attempt+1}/{max_retries}: Interface {iface} is not properly configured")
-            if "state UP" not in iface_status:
+            if not is_up:
                 if DEBUG:
                     print(f"  - Interface is not up, bringing it up...")
                 run_cmd(['ip', 'link', 'set', 'dev', iface, 'up'], check=True)
             
-            if f"inet {ip_addr}" not in iface_addr:
+            if not has_addr:
                 if DEBUG:
                     print(f"  - IP address {ip_addr} not configured, reconfiguring...")
                 run_cmd(['ip', 'addr', 'flush', 'dev', iface], check=False)
                 run_cmd(['ip', 'addr', 'add', f'{ip_addr}/{prefix}', 'dev', iface], check=True)
             
             if DEBUG:
-                print(f"  - Waiting {retry_delay} seconds before checking again...")
-            time.sleep(retry_delay)
+                print(f"  - Waiting up to {retry_delay} seconds for the link to come up...")
+            wait_for_link_up(iface, retry_delay)
     
     if not interface_up:
         print(f"{RED}ERROR: Failed to bring up interface {iface} after {max_retries} attempts.{RESET}")
@@ -721,45 +1091,86 @@ def add_loopbacks(m1,m2,client):
         m1: NSB subnet in CIDR notation
         m2: Sensor subnet in CIDR notation
         client: Client subnet in CIDR notation
+        
+    Raises:
+        subprocess.CalledProcessError: If a loopback interface cannot be brought up
     """
+    commands, up_commands = [], []
     for name,subnet in [('mgmt1',m1),('mgmt2',m2),('client',client)]:
-        net = ipaddress.IPv4Network(subnet)
         iface = f'dummy_{name}'
-        addr = str(net.network_address+1)
-        prefix = net.prefixlen
-        run_cmd(['ip','link','add',iface,'type','dummy'], check=False)
-        run_cmd(['ip','addr','add',f'{addr}/{prefix}','dev',iface], check=False)
-        run_cmd(['ip','link','set','dev',iface,'up'], check=True)
+        addr, prefix = subnet_first_host(subnet)
+        commands += [f'link add {iface} type dummy',
+                     f'addr add {addr}/{prefix} dev {iface}']
+        up_commands.append(f'link set dev {iface} up')
         if DEBUG:
             print(f'Loopback {iface} → {addr}/{prefix}')
+    # Creating the interfaces and addresses may fail if they are left over
+    # from a previous run, but every loopback must come up
+    ip_batch(commands)
+    ip_batch(up_commands, check=True)
+
+# Attach a classic BPF program to a socket
+def attach_bpf_filter(sock, program):
+    """
+    Attach a classic BPF program to a raw socket with SO_ATTACH_FILTER.
+    
+    Args:
+        sock: The AF_PACKET socket to filter
+        program: Packed struct sock_filter instructions (8 bytes each)
+    """
+    insns = ctypes.create_string_buffer(program, len(program))
+    fprog = struct.pack('HL', len(program) // 8, ctypes.addressof(insns))
+    sock.setsockopt(socket.SOL_SOCKET, SO_ATTACH_FILTER, fprog)
 
 # OSPF Hello sniff
-def sniff_ospf_hello(iface, timeout=60):
+def sniff_ospf_hello(iface, timeout=60, stop_fd=None):
     """
     Sniff for OSPF Hello packets on the specified interface.
     
-    This function waits for an OSPF Hello packet on the specified interface
-    and extracts the source IP, area, hello interval, and dead interval.
+    This function waits for an OSPF Hello packet on the specified interface,
+    using a raw socket with a kernel BPF filter for IP protocol 89, and extracts the source IP, area, hello interval, and dead interval.
     
     Args:
         iface: The network interface to sniff on
         timeout: Maximum time to wait for an OSPF Hello packet in seconds (default: 60)
+        stop_fd: Optional file descriptor; the sniff stops early once it becomes readable
         
     Returns:
-        tuple: (source_ip, area, hello_interval, dead_interval)
+        tuple: (source_ip, area, hello_interval, dead_interval), or None if stopped through stop_fd
         
     Raises:
         SystemExit: If no OSPF Hello packet is received within the timeout
     """
+    from scapy.layers.inet import IP
+    from scapy.layers.l2 import Ether
+    from scapy.contrib.ospf import OSPF_Hdr, OSPF_Hello
+    
     print(f'\nWaiting for OSPF Hello on {iface}...')
     
-    # Use scapy to sniff for OSPF Hello packets
-    pkts = sniff(iface=iface, filter='ip proto 89', timeout=timeout, count=1)
-    if not pkts:
+    pkt = None
+    with socket.socket(socket.AF_PACKET, socket.SOCK_RAW, socket.htons(0x0800)) as sock:
+        attach_bpf_filter(sock, OSPF_BPF_FILTER)
+        sock.bind((iface, 0))
+        watch = [sock] if stop_fd is None else [sock, stop_fd]
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            readable, _, _ = select.select(watch, [], [], remaining)
+            if not readable:
+                break
+            if stop_fd in readable:
+                return None
+            frame = Ether(sock.recv(65535))
+            if OSPF_Hello in frame:
+                pkt = frame
+                break
+    
+    if pkt is None:
         print('No OSPF Hello received; aborting.')
         sys.exit(1)
     
-    pkt = pkts[0]
     src = pkt[IP].src
     area = pkt[OSPF_Hdr].area
     hi = pkt[OSPF_Hello].hellointerval
@@ -770,6 +1181,105 @@ def sniff_ospf_hello(iface, timeout=60):
     # Don't cast area to int as it can be in dotted notation (e.g., 0.0.0.0)
     return src, area, int(hi), int(di)
 
+# Matches the ospfd line of /etc/frr/daemons
+OSPFD_LINE_RE = re.compile(rb'^ospfd=.*$', re.M)
+
+# Persistent vtysh session helpers
+VTYSH_SENTINEL = '__nrt_end__'
+
+# Interval between OSPF neighbor polls on a persistent vtysh session, in seconds
+OSPF_POLL_INTERVAL = 0.25
+
+def vtysh_open():
+    """
+    Start a vtysh process that reads commands from stdin.
+    
+    The session only works if vtysh flushes its output while stdout is a
+    pipe, so it is checked with one quick round trip before it is used.
+    A session that does not answer within a second is closed, letting
+    callers fall back to one-shot `vtysh -c` calls without waiting for the
+    full query timeout.
+    
+    Returns:
+        subprocess.Popen: The vtysh process, or None if it could not be started or did not respond
+    """
+    try:
+        session = subprocess.Popen(['vtysh'], stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                   stderr=subprocess.STDOUT, bufsize=0)
+    except OSError as e:
+        if DEBUG:
+            print(f'DEBUG: Could not start vtysh session: {e}')
+        return None
+    if vtysh_query(session, 'echo', timeout=1) is None:
+        if DEBUG:
+            print('DEBUG: vtysh session did not respond, falling back to vtysh -c')
+        vtysh_close(session)
+        return None
+    return session
+
+def vtysh_close(session):
+    """
+    Stop a vtysh process started by vtysh_open().
+    
+    Args:
+        session: The vtysh process (None is ignored)
+    """
+    if session is None:
+        return
+    try:
+        session.stdin.close()
+        session.wait(timeout=2)
+    except (OSError, subprocess.TimeoutExpired):
+        session.kill()
+        session.wait()
+
+def vtysh_query(session, command, timeout=5):
+    """
+    Run a command in a persistent vtysh session and return its output.
+    
+    Each command is followed by an `echo` of a sentinel line, so the end of
+    its output can be found without restarting vtysh for every command.
+    
+    Args:
+        session: The vtysh process from vtysh_open()
+        command: The vtysh command to run
+        timeout: Maximum time to wait for the output in seconds (default: 5)
+        
+    Returns:
+        bytes: The command output, or None if the session did not respond
+    """
+    if session is None or session.poll() is not None:
+        return None
+    if DEBUG:
+        print(f'DEBUG: vtysh session: {command}')
+    try:
+        session.stdin.write(f'{command}\necho {VTYSH_SENTINEL}\n'.encode())
+    except OSError:
+        return None
+    
+    sentinel = VTYSH_SENTINEL.encode()
+    fd = session.stdout.fileno()
+    buf = b''
+    deadline = time.monotonic() + timeout
+    while True:
+        lines = buf.split(b'\n')
+        # The sentinel on a line of its own is the echo output; the command
+        # line itself may also be echoed back after the prompt
+        if any(line.strip() == sentinel for line in lines[:-1]):
+            end = next(i for i, line in enumerate(lines) if line.strip() == sentinel)
+            return b'\n'.join(line for line in lines[:end]
+                              if not line.rstrip().endswith(b'echo ' + sentinel))
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return None
+        readable, _, _ = select.select([fd], [], [], remaining)
+        if not readable:
+            return None
+        chunk = os.read(fd, 65536)
+        if not chunk:
+            return None
+        buf += chunk
+
 # Configure OSPF - using vtysh commands directly like the original
 def configure_ospf(iface, ip, prefix, m1, m2, client, up, area, hi, di):
     """
@@ -796,15 +1306,14 @@ def configure_ospf(iface, ip, prefix, m1, m2, client, up, area, hi, di):
     Raises:
         SystemExit: If connectivity to the upstream router cannot be established
     """
-    n1=ipaddress.IPv4Network(m1);n2=ipaddress.IPv4Network(m2);n3=ipaddress.IPv4Network(client)
+    networks = [parse_subnet(subnet) for subnet in (m1, m2, client)]
     
     if DEBUG:
         print(f"Configuring FRR and OSPF for interface {iface}")
     
     # Enable ospfd in daemons file
-    lines=open('/etc/frr/daemons').read().splitlines()
-    with open('/etc/frr/daemons','w') as f:
-        for l in lines: f.write('ospfd=yes\n' if l.startswith('ospfd=') else l+'\n')
+    with open('/etc/frr/daemons','rb') as f: daemons = f.read()
+    atomic_write('/etc/frr/daemons', OSPFD_LINE_RE.sub(b'ospfd=yes', daemons))
     
     # Restart FRR
     if DEBUG:
@@ -816,49 +1325,49 @@ def configure_ospf(iface, ip, prefix, m1, m2, client, up, area, hi, di):
         print("Waiting for FRR to start...")
     time.sleep(5)
     
-    # Configure OSPF using vtysh commands
-    cmds=[
-        'vtysh','-c','configure terminal','-c','router ospf',
-        '-c',f'network {ip}/{prefix} area {area}',
-        '-c',f'network {n1.network_address}/{n1.prefixlen} area {area}',
-        '-c',f'network {n2.network_address}/{n2.prefixlen} area {area}',
-        '-c',f'network {n3.network_address}/{n3.prefixlen} area {area}',
-        '-c','exit','-c',f'interface {iface}',
-        '-c',f'ip ospf hello-interval {hi}',
-        '-c',f'ip ospf dead-interval {di}',
-        '-c','exit','-c','end','-c','write memory'
+    # Configure OSPF using vtysh commands. The whole block, including the
+    # final write, goes to vtysh in a single invocation
+    config = [
+        'configure terminal',
+        'router ospf',
+        f'network {ip}/{prefix} area {area}',
+        *(f'network {net}/{plen} area {area}' for net, plen in networks),
+        'exit',
+        f'interface {iface}',
+        f'ip ospf hello-interval {hi}',
+        f'ip ospf dead-interval {di}',
+        'exit',
+        'end',
+        'write memory',
     ]
+    cmds = ['vtysh']
+    for line in config:
+        cmds += ['-c', line]
     run_cmd(cmds, check=True, capture_output=True)
     
     # Verify interface is up and properly configured
     if DEBUG:    
         print(f"Verifying interface {iface} is up and properly configured...")
-    iface_status = run_cmd(['ip', 'link', 'show', 'dev', iface], capture_output=True, text=True).stdout
-
-    if "state UP" not in iface_status:
+    if not link_is_up(iface):
         if DEBUG:
             print(f"Interface {iface} is not up. Attempting to bring it up...")
         run_cmd(['ip', 'link', 'set', 'dev', iface, 'up'], check=True)
-        # Wait for interface to come up
-        time.sleep(2)
-        # Check again
-        iface_status = run_cmd(['ip', 'link', 'show', 'dev', iface], capture_output=True, text=True).stdout
-        if "state UP" not in iface_status:
+        # Wait for interface to come up, returning as soon as the kernel reports it up
+        if not wait_for_link_up(iface, 2):
             print(f"WARNING: Interface {iface} could not be brought up. OSPF may not work correctly.")
     
     # Verify IP address is configured
-    iface_addr = run_cmd(['ip', 'addr', 'show', 'dev', iface], capture_output=True, text=True).stdout
-    if f"inet {ip}" not in iface_addr:
+    if not iface_has_addr(get_iface_info(iface), ip):
         if DEBUG:
             print(f"IP address {ip} not found on interface {iface}. Reconfiguring...")
         run_cmd(['ip', 'addr', 'flush', 'dev', iface], check=False)
         run_cmd(['ip', 'addr', 'add', f'{ip}/{prefix}', 'dev', iface], check=True)
     
     # Show the routing table
-    route_output = run_cmd(['ip', 'route'], capture_output=True, text=True).stdout
     if DEBUG:
+        route_output = run_cmd(['ip', 'route'], capture_output=True).stdout
         print("Current routing table:")
-        print(route_output)
+        print(route_output.decode(errors='replace'))
     
     # Check connectivity to the upstream router with retry logic
     print(f"Testing connectivity to upstream router {up}")
@@ -867,13 +1376,12 @@ def configure_ospf(iface, ip, prefix, m1, m2, client, up, area, hi, di):
     router_reachable = False
     
     for attempt in range(max_retries):
-        ping_result = run_cmd(['ping', '-c', '4', up], capture_output=True)
-        if ping_result.returncode == 0:
+        if ping_host(up):
             router_reachable = True
-            print(f"Connectivity to upstream router {up}: {GREEN}Success{RESET}")
+            print(f"Connectivity to upstream router {up}: {OK_LABEL}")
             break
         else:
-            print(f"Attempt {attempt+1}/{max_retries}: Connectivity to upstream router {up}: {RED}Fail{RESET}")
+            print(f"Attempt {attempt+1}/{max_retries}: Connectivity to upstream router {up}: {FAIL_LABEL}")
             if attempt < max_retries - 1:
                 print(f"Retrying in {retry_delay} seconds...")
                 time.sleep(retry_delay)
@@ -892,7 +1400,7 @@ def show_ospf_status():
     Wait for and verify OSPF adjacency reaches Full/DR state.
     
     This function:
-    - Polls the OSPF neighbor state every second for up to 30 seconds
+    - Polls the OSPF neighbor state for up to 30 seconds over a single vtysh session
     - Checks for Full/DR state in the OSPF neighbor output
     - Displays routing tables for debugging purposes
     
@@ -901,30 +1409,46 @@ def show_ospf_status():
     """
     print('\n=== Waiting for OSPF state Full/DR (30s timeout) ===')
     success = False
-    for _ in range(30):
-        out = run_cmd(['vtysh','-c','show ip ospf neighbor'], capture_output=True, text=True).stdout
-        if any('Full/DR' in l for l in out.splitlines()[1:]):
-            success = True
-            print('OSPF reached Full/DR state')
-            break
-        time.sleep(1)
-    if not success:
-        print('OSPF never reached Full/DR state after 30s')
-    
-    # Wait a bit more to ensure stability
-    time.sleep(5)
-    
-    # Show the routing table from FRR
-    frr_routes = run_cmd(['vtysh', '-c', 'show ip route'], capture_output=True, text=True).stdout
-    if DEBUG:
-        print("\n=== FRR Routing Table ===")
-        print(frr_routes)
-    
-    # Show the kernel routing table
-    route_output = run_cmd(['ip', 'route'], capture_output=True, text=True).stdout
-    if DEBUG:
-        print(f'\n=== Kernel Routing Table ===')
-        print(route_output)
+    # Poll and read the routing table through one vtysh session instead of
+    # starting vtysh for every command
+    session = vtysh_open()
+    deadline = time.monotonic() + 30
+    try:
+        while time.monotonic() < deadline:
+            out = vtysh_query(session, 'show ip ospf neighbor')
+            if out is None:
+                # Session unusable, fall back to one vtysh per poll
+                vtysh_close(session)
+                session = None
+                out = run_cmd(['vtysh','-c','show ip ospf neighbor'], capture_output=True).stdout
+            if any(b'Full/DR' in l for l in out.splitlines()[1:]):
+                success = True
+                print('OSPF reached Full/DR state')
+                break
+            # Queries on the open session are cheap, so poll at a finer interval
+            time.sleep(OSPF_POLL_INTERVAL if session is not None else 1)
+        if not success:
+            print('OSPF never reached Full/DR state after 30s')
+        
+        # Optionally wait a bit more to ensure stability. Once the adjacency is
+        # Full the LSDBs are already synchronized, so by default no wait is needed
+        if success and args.ospf_stabilize_seconds > 0:
+            time.sleep(args.ospf_stabilize_seconds)
+        
+        # Show the routing tables from FRR and the kernel; they are only
+        # printed in debug mode, so skip fetching them otherwise
+        if DEBUG:
+            frr_routes = vtysh_query(session, 'show ip route')
+            if frr_routes is None:
+                frr_routes = run_cmd(['vtysh', '-c', 'show ip route'], capture_output=True).stdout
+            print("\n=== FRR Routing Table ===")
+            print(frr_routes.decode(errors='replace'))
+            
+            route_output = run_cmd(['ip', 'route'], capture_output=True).stdout
+            print(f'\n=== Kernel Routing Table ===')
+            print(route_output.decode(errors='replace'))
+    finally:
+        vtysh_close(session)
     
     return success
 
@@ -943,7 +1467,8 @@ def configure_static_route(gateway, iface):
     if DEBUG:
         print(f"\nConfiguring static default route via {gateway} on {iface}...")
     
-    # Try to add the route
+    # Try to add the route. ip only returns once the kernel has acknowledged the
+    # netlink request, so the route table can be checked straight away
     run_cmd(['ip','route','add','default','via',gateway,'metric','200'],check=False)
     
     # Verify the route was added
@@ -953,8 +1478,8 @@ def configure_static_route(gateway, iface):
     
     for attempt in range(max_retries):
         # Check if route exists
-        route_output = run_cmd(['ip','route','show','default'], capture_output=True, text=True).stdout
-        if f"default via {gateway}" in route_output:
+        default_routes = get_default_routes()
+        if any(route.get('gateway') == gateway for route in default_routes):
             if DEBUG:
                 print(f"Static default route via {gateway} successfully added")
             route_added = True
@@ -963,28 +1488,29 @@ def configure_static_route(gateway, iface):
             if DEBUG:
                 print(f"Attempt {attempt+1}/{max_retries}: Static route not found")
                 print(f"  - Current default routes:")
-                for line in route_output.splitlines():
-                    print(f"    {line}")
+                for route in default_routes:
+                    print(f"    default via {route.get('gateway')} dev {route.get('dev')} metric {route.get('metric', 0)}")
+            
+            # A successful add is visible immediately, so only back off once a
+            # retry has already failed
+            if attempt > 0:
+                if DEBUG:
+                    print(f"  - Waiting {retry_delay} seconds before retrying...")
+                time.sleep(retry_delay)
             
             # Try to ensure interface is up before adding route
-            iface_status = run_cmd(['ip', 'link', 'show', 'dev', iface], capture_output=True, text=True).stdout
-            if "state UP" not in iface_status:
+            if not link_is_up(iface):
                 if DEBUG:
                     print(f"  - Interface {iface} is not up, bringing it up...")
                 run_cmd(['ip', 'link', 'set', 'dev', iface, 'up'], check=True)
-                time.sleep(1)  # Give it a moment to come up
+                wait_for_link_up(iface, 1)  # Give it a moment to come up
             
             # Try adding the route again
             if DEBUG:
                 print(f"  - Retrying route addition...")
-            # First try to delete any existing default routes to avoid conflicts
-            run_cmd(['ip','route','del','default'], check=False)
-            # Then add our route
-            run_cmd(['ip','route','add','default','via',gateway,'metric','200'],check=False)
-            
-            if DEBUG:
-                print(f"  - Waiting {retry_delay} seconds before checking again...")
-            time.sleep(retry_delay)
+            # Delete any existing default routes to avoid conflicts, then add ours,
+            # in one ip process
+            ip_batch(['route del default', f'route add default via {gateway} metric 200'])
     
     if not route_added:
         print(f"{RED}ERROR: Failed to add static default route via {gateway} after {max_retries} attempts.{RESET}")
@@ -993,6 +1519,377 @@ def configure_static_route(gateway, iface):
     
     return route_added
 
+# DHCP OFFER capture
+def open_dhcp_capture(iface):
+    """
+    Open a raw socket that receives only DHCP (UDP port 67/68) frames on an interface.
+    
+    Args:
+        iface: The network interface to capture on
+        
+    Returns:
+        socket.socket: The bound AF_PACKET socket
+    """
+    sock = socket.socket(socket.AF_PACKET, socket.SOCK_RAW, socket.htons(0x0800))
+    try:
+        attach_bpf_filter(sock, DHCP_BPF_FILTER)
+        sock.bind((iface, 0))
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+def parse_dhcp_offer(frame):
+    """
+    Parse an Ethernet frame and return its details if it is a DHCP OFFER.
+    
+    Only the fixed BOOTP header offsets and the option TLVs up to the
+    message type are inspected.
+    
+    Args:
+        frame: Raw Ethernet frame bytes (IPv4/UDP, as passed by DHCP_BPF_FILTER)
+        
+    Returns:
+        dict: OFFER details, or None if the frame is not a DHCP OFFER
+    """
+    udp = 14 + (frame[14] & 0x0F) * 4
+    bootp = udp + 8
+    # op must be BOOTREPLY and the DHCP magic cookie must follow the BOOTP header
+    if len(frame) < bootp + 240 or frame[bootp] != 2 or frame[bootp+236:bootp+240] != b'\x63\x82\x53\x63':
+        return None
+    
+    opt = bootp + 240
+    while opt + 2 <= len(frame):
+        code = frame[opt]
+        if code == 255:
+            break
+        if code == 0:
+            opt += 1
+            continue
+        length = frame[opt+1]
+        if code == 53:
+            if length < 1 or opt + 2 >= len(frame) or frame[opt+2] != 2:
+                return None
+            sport, dport = struct.unpack_from('!HH', frame, udp)
+            return {
+                'chaddr': frame[bootp+28:bootp+34],
+                'yiaddr': socket.inet_ntoa(frame[bootp+16:bootp+20]),
+                'siaddr': socket.inet_ntoa(frame[bootp+20:bootp+24]),
+                'giaddr': socket.inet_ntoa(frame[bootp+24:bootp+28]),
+                'src': f'{socket.inet_ntoa(frame[26:30])}:{sport}',
+                'dst': f'{socket.inet_ntoa(frame[30:34])}:{dport}',
+            }
+        opt += 2 + length
+    return None
+
+def build_dhcp_discover(client_mac, xid):
+    """
+    Build a broadcast DHCP DISCOVER Ethernet frame.
+    
+    Args:
+        client_mac: Client MAC address (aa:bb:cc:dd:ee:ff), used as source and chaddr
+        xid: DHCP transaction ID
+        
+    Returns:
+        bytes: The frame, ready to send on an AF_PACKET socket
+    """
+    mac = bytes.fromhex(client_mac.replace(':', ''))
+    # op=BOOTREQUEST, htype=Ethernet, hlen=6, hops=0, xid, secs=0, flags=broadcast,
+    # zero ciaddr/yiaddr/siaddr/giaddr, chaddr, empty sname/file, magic cookie
+    bootp = (struct.pack('!BBBBIHH16x', 1, 1, 6, 0, xid, 0, 0x8000) + mac.ljust(16, b'\x00')
+             + bytes(192) + b'\x63\x82\x53\x63'
+             + bytes((53, 1, 1, 255)))  # DHCP message type DISCOVER, end
+    # Pad to the 300 byte minimum BOOTP message size
+    bootp = bootp.ljust(300, b'\x00')
+    udp = struct.pack('!HHHH', 68, 67, 8 + len(bootp), 0) + bootp
+    ip_header = struct.pack('!BBHHHBBH4s4s', 0x45, 0, 20 + len(udp), 1, 0, 64, socket.IPPROTO_UDP, 0,
+                            bytes(4), b'\xff\xff\xff\xff')
+    ip_header = ip_header[:10] + struct.pack('!H', inet_checksum(ip_header)) + ip_header[12:]
+    return b'\xff' * 6 + mac + b'\x08\x00' + ip_header + udp
+
+def wait_for_dhcp_offers(sock, client_macs, timeout):
+    """
+    Wait for DHCP OFFERs for a set of client MAC addresses on a capture socket.
+    
+    Frames already queued on the socket are checked first, so OFFERs that
+    arrived while other requests were in flight are not missed. Returns as
+    soon as every client has an OFFER.
+    
+    Args:
+        sock: Socket returned by open_dhcp_capture()
+        client_macs: Client MAC addresses (aa:bb:cc:dd:ee:ff) to collect OFFERs for
+        timeout: Maximum time to wait in seconds
+        
+    Returns:
+        dict: OFFER details from parse_dhcp_offer(), keyed by client MAC address
+    """
+    chaddrs = {bytes.fromhex(mac.replace(':', '')): mac for mac in client_macs}
+    offers = {}
+    deadline = time.monotonic() + max(timeout, 0)
+    while len(offers) < len(chaddrs):
+        readable, _, _ = select.select([sock], [], [], max(deadline - time.monotonic(), 0))
+        if not readable:
+            break
+        offer = parse_dhcp_offer(sock.recv(65535))
+        if offer and offer['chaddr'] in chaddrs and chaddrs[offer['chaddr']] not in offers:
+            if DEBUG:
+                print("  [Capture] Found DHCP OFFER!")
+                print(f"  [Capture] DHCP OFFER details:")
+                print(f"    Your IP: {offer['yiaddr']}")
+                print(f"    Server IP: {offer['siaddr']}")
+                print(f"    Gateway: {offer['giaddr']}")
+                print(f"    Source: {offer['src']}")
+                print(f"    Destination: {offer['dst']}")
+            offers[chaddrs[offer['chaddr']]] = offer
+    return offers
+
+# Internet checksum (ICMP messages, IPv4 headers)
+def inet_checksum(data):
+    """
+    Compute the Internet checksum of an ICMP message or IPv4 header.
+    
+    Args:
+        data: The message or header bytes with a zero checksum field
+        
+    Returns:
+        int: The 16-bit checksum
+    """
+    if len(data) % 2:
+        data += b'\x00'
+    total = sum(struct.unpack(f'!{len(data) // 2}H', data))
+    total = (total >> 16) + (total & 0xFFFF)
+    total += total >> 16
+    return ~total & 0xFFFF
+
+# In-process ping of several hosts over one raw socket
+def icmp_ping(hosts, src_ip=None, count=1, timeout=1):
+    """
+    Send ICMP echo requests to several hosts at once and collect the replies.
+    
+    One echo is sent to every host that has not replied yet, then replies are
+    read for up to `timeout` seconds; this repeats up to `count` times, so a
+    host is retried roughly once a second like ping(8) but healthy hosts are
+    done after one round trip.
+    
+    Args:
+        hosts: Target IP addresses or hostnames
+        src_ip: Optional source IP address to send from
+        count: Maximum number of echo requests per host
+        timeout: Time to wait for replies after each round, in seconds
+        
+    Returns:
+        set: The hosts (as given) that replied
+    """
+    addrs = {}
+    for host in hosts:
+        resolved = resolve_a(host)
+        if resolved:
+            addrs.setdefault(resolved[0], []).append(host)
+        elif DEBUG:
+            print(f"DEBUG: Could not resolve {host} for ping")
+    
+    # Random identifier so concurrent callers do not count each other's replies
+    ident = random.randint(0, 0xFFFF)
+    replied = set()
+    with socket.socket(socket.AF_INET, socket.SOCK_RAW, socket.IPPROTO_ICMP) as sock:
+        if src_ip:
+            sock.bind((src_ip, 0))
+        for seq in range(count):
+            for addr in addrs.keys() - replied:
+                header = struct.pack('!BBHHH', 8, 0, 0, ident, seq)
+                payload = struct.pack('!d', time.time()) + bytes(48)
+                checksum = inet_checksum(header + payload)
+                packet = struct.pack('!BBHHH', 8, 0, checksum, ident, seq) + payload
+                try:
+                    sock.sendto(packet, (addr, 0))
+                except OSError as e:
+                    if DEBUG:
+                        print(f"DEBUG: Failed to send ping to {addr}: {e}")
+            
+            deadline = time.monotonic() + timeout
+            while replied != addrs.keys():
+                readable, _, _ = select.select([sock], [], [], max(deadline - time.monotonic(), 0))
+                if not readable:
+                    break
+                packet, (addr, _) = sock.recvfrom(65535)
+                ihl = (packet[0] & 0x0F) * 4
+                if len(packet) < ihl + 8:
+                    continue
+                icmp_type, _, _, reply_ident, _ = struct.unpack_from('!BBHHH', packet, ihl)
+                if icmp_type == 0 and reply_ident == ident and addr in addrs:
+                    replied.add(addr)
+            if replied == addrs.keys():
+                break
+    
+    return {host for addr in replied for host in addrs[addr]}
+
+# Reachability check for a single host
+def ping_host(tgt, src_ip=None, count=4):
+    """
+    Check whether a host answers ping.
+    
+    Args:
+        tgt: Target IP address or hostname
+        src_ip: Optional source IP address to ping from
+        count: Maximum number of echo requests to send
+        
+    Returns:
+        bool: True if the host replied
+    """
+    return tgt in icmp_ping([tgt], src_ip, count)
+
+# Ping targets from a source IP, retrying once with more pings on failure
+def ping_with_retry(src_ip, targets):
+    """
+    Ping several targets from a source IP, retrying the ones that fail once with more pings.
+    
+    Args:
+        src_ip: Source IP address to ping from
+        targets: Target IP addresses or hostnames
+        
+    Returns:
+        list: (success, retried) tuples in the same order as targets
+    """
+    ok = icmp_ping(targets, src_ip, count=2)
+    failed = [tgt for tgt in targets if tgt not in ok]
+    retry_ok = icmp_ping(failed, src_ip, count=3) if failed else set()  # Try with more pings
+    return [(True, False) if tgt in ok else (tgt in retry_ok, True) for tgt in targets]
+
+# Resolve a test name against a DNS server from a source IP
+def dig_probe(server, src_ip, name='www.google.com'):
+    """
+    Check that a DNS server answers a query sent from a source IP.
+    
+    Args:
+        server: DNS server IP address
+        src_ip: Source IP address to query from
+        name: Hostname to resolve (default: www.google.com)
+        
+    Returns:
+        bool: True if the server returned an answer, False otherwise
+    """
+    r = run_cmd(['dig', f'@{server}', '-b', src_ip, name, '+short'], capture_output=True)
+    return r.returncode == 0 and bool(r.stdout.strip())
+
+# RADIUS authentication probe
+def radius_probe(srv, user, pwd, secret):
+    """
+    Send a RADIUS Access-Request with radclient.
+    
+    Args:
+        srv: RADIUS server IP address
+        user: RADIUS username
+        pwd: RADIUS password
+        secret: RADIUS shared secret
+        
+    Returns:
+        bool: True if radclient got an answer, False otherwise
+    """
+    cmd = (f'echo "User-Name={user},User-Password={pwd}" '
+          f'| radclient -x -s {srv}:1812 auth {secret}')
+    return run_cmd_silent(cmd, shell=True) == 0
+
+# NTP probe
+def ntp_probe(src_ip, server, timeout=2, tries=2):
+    """
+    Query an NTP server from a source IP with a single SNTP client request.
+    
+    The request is sent to every address the server name resolves to (like
+    ntpdate does) and the first valid server reply counts as success.
+    
+    Args:
+        src_ip: Source IP address to query from
+        server: NTP server hostname or IP address
+        timeout: Time to wait for a reply per attempt, in seconds (default: 2)
+        tries: Number of requests to send before giving up (default: 2)
+        
+    Returns:
+        bool: True if the server answered, False otherwise
+    """
+    addrs = set(resolve_a(server))
+    if not addrs:
+        if DEBUG:
+            print(f"DEBUG: Could not resolve NTP server {server}")
+        return False
+    
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        try:
+            sock.bind((src_ip, 0))
+        except OSError as e:
+            if DEBUG:
+                print(f"DEBUG: Could not bind NTP query to {src_ip}: {e}")
+            return False
+        for _ in range(tries):
+            # LI=0, VN=4, Mode=3 (client); the transmit timestamp is echoed
+            # back by the server as the originate timestamp
+            transmit = struct.pack('!II', int(time.time()) + NTP_EPOCH_OFFSET, random.getrandbits(32))
+            request = b'\x23' + bytes(39) + transmit
+            for addr in addrs:
+                try:
+                    sock.sendto(request, (addr, NTP_PORT))
+                except OSError:
+                    pass
+            deadline = time.monotonic() + timeout
+            while True:
+                readable, _, _ = select.select([sock], [], [], max(deadline - time.monotonic(), 0))
+                if not readable:
+                    break
+                reply, (addr, _) = sock.recvfrom(512)
+                # Server mode (4), a real stratum (not a kiss-o'-death) and our own request
+                if (len(reply) >= 48 and addr in addrs and reply[0] & 0x07 == 4
+                        and 0 < reply[1] < 16 and reply[24:32] == transmit):
+                    return True
+    return False
+
+# IPv4 address lookup, cached so each name is resolved once per run by all probes
+@lru_cache(maxsize=64)
+def lookup_a(hostname):
+    """
+    Resolve a hostname to its IPv4 addresses through the system resolver.
+    
+    Falls back to `dig +short` if getaddrinfo fails. Failures raise instead
+    of returning a result, so lru_cache only keeps successful lookups and a
+    transient resolver error is retried by the next probe.
+    
+    Args:
+        hostname: Hostname to resolve
+        
+    Returns:
+        tuple: IPv4 addresses in resolver order
+        
+    Raises:
+        LookupError: If the name did not resolve
+    """
+    try:
+        infos = socket.getaddrinfo(hostname, None, socket.AF_INET, socket.SOCK_STREAM)
+        return tuple(dict.fromkeys(info[4][0] for info in infos))
+    except OSError as e:
+        if DEBUG:
+            print(f"DEBUG: getaddrinfo failed for {hostname} ({e}), trying dig")
+    r = run_cmd(['dig', hostname, '+short'], capture_output=True)
+    addrs = ()
+    if r.returncode == 0:
+        # dig +short also lists CNAME targets (ending in '.'); keep only the addresses
+        addrs = tuple(line.decode() for line in r.stdout.split() if not line.endswith(b'.'))
+    if not addrs:
+        raise LookupError(f'could not resolve {hostname}')
+    return addrs
+
+def resolve_a(hostname):
+    """
+    Resolve a hostname to its IPv4 addresses, using the lookup_a cache.
+    
+    Args:
+        hostname: Hostname to resolve
+        
+    Returns:
+        tuple: IPv4 addresses in resolver order, empty if the name did not resolve
+    """
+    try:
+        return lookup_a(hostname)
+    except LookupError:
+        return ()
+
 # Connectivity tests with DNS fallback logic
 def run_tests(iface, ip_addr, mgmt1, client_subnet, dhcp_servers, radius_servers, secret, user, pwd, run_dhcp, run_radius, custom_dns_servers=None, custom_ntp_servers=None, test_results=None):
     """
@@ -1021,47 +1918,49 @@ def run_tests(iface, ip_addr, mgmt1, client_subnet, dhcp_servers, radius_servers
         run_radius: Whether to run RADIUS tests
         custom_dns_servers: Optional list of custom DNS servers to test
         custom_ntp_servers: Optional list of custom NTP servers to test
-        test_results: Optional list to append test results to
+        test_results: Optional dictionary to add test results to
         
     Returns:
-        list: A list of tuples containing test results (test_name, result)
+        dict: Test results keyed by test name, in the order the tests ran
     """
     # Initialize empty lists if None
     custom_dns_servers = custom_dns_servers or []
     custom_ntp_servers = custom_ntp_servers or []
     # Dictionary to store test results for summary
     if test_results is None:
-        test_results = []
+        test_results = {}
     # Set initial DNS
     dns_servers = ['8.8.8.8', '8.8.4.4']
     
-    # Write DNS servers to resolv.conf
+    # Write DNS servers to resolv.conf in one write, replacing the file atomically
     def write_resolv(servers):
-        with open('/etc/resolv.conf','w') as f:
-            for s in servers:
-                f.write(f'nameserver {s}\n')
+        atomic_write('/etc/resolv.conf', ''.join(f'nameserver {s}\n' for s in servers).encode())
     write_resolv(dns_servers)
-    conf.route.resync()
     
     # Initial connectivity
     ping_ok = False
     print(f'\nInitial Ping Tests from {ip_addr}:')
     
+    # Run the ping and DNS probes for all default and custom DNS servers
+    # concurrently; results are printed afterwards in the usual order
+    initial_targets = dns_servers + custom_dns_servers
+    with ThreadPoolExecutor(max_workers=len(initial_targets)) as ex:
+        dig_futures = [ex.submit(dig_probe, d, ip_addr) for d in initial_targets]
+        ping_results = ping_with_retry(ip_addr, initial_targets)
+        dig_results = [f.result() for f in dig_futures]
+    
+    # Per-server probe results, indexed by the reporting and DNS selection below
+    probes = {tgt: {'ping_ok': reached, 'retried': retried, 'dig_ok': dig_ok}
+              for tgt, (reached, retried), dig_ok in zip(initial_targets, ping_results, dig_results)}
+    
     # Test default DNS servers with retry logic
     for tgt in dns_servers:
-        # First attempt
-        r = run_cmd(['ping', '-c', '2', '-I', ip_addr, tgt], capture_output=True)
-        result = r.returncode == 0
-        
-        # If first attempt fails, retry once more
-        if not result:
-            print(f'Ping {tgt} from {ip_addr}: {RED}Fail{RESET} (First attempt)')
+        result, retried = probes[tgt]['ping_ok'], probes[tgt]['retried']
+        if retried:
+            print(f'Ping {tgt} from {ip_addr}: {FAIL_LABEL} (First attempt)')
             print(f'Retrying ping to {tgt}...')
-            r = run_cmd(['ping', '-c', '3', '-I', ip_addr, tgt], capture_output=True)  # Try with more pings
-            result = r.returncode == 0
-        
-        print(f'Ping {tgt} from {ip_addr}: ' + (GREEN+'Success'+RESET if result else RED+'Fail{RESET} (After retry)'))
-        test_results.append((f'Initial Ping {tgt} from {ip_addr}', result))
+        print(f'Ping {tgt} from {ip_addr}: ' + (OK_LABEL if result else FAIL_LABEL+' (After retry)'))
+        test_results[f'Initial Ping {tgt} from {ip_addr}'] = result
         ping_ok |= result
     
     # Test custom DNS servers if provided (with retry logic)
@@ -1069,19 +1968,12 @@ def run_tests(iface, ip_addr, mgmt1, client_subnet, dhcp_servers, radius_servers
         print(f'\nCustom DNS Server Ping Tests from {ip_addr}:')
         custom_ping_ok = False
         for tgt in custom_dns_servers:
-            # First attempt
-            r = run_cmd(['ping', '-c', '2', '-I', ip_addr, tgt], capture_output=True)
-            result = r.returncode == 0
-            
-            # If first attempt fails, retry once more
-            if not result:
-                print(f'Ping {tgt} from {ip_addr}: {RED}Fail{RESET} (First attempt)')
+            result, retried = probes[tgt]['ping_ok'], probes[tgt]['retried']
+            if retried:
+                print(f'Ping {tgt} from {ip_addr}: {FAIL_LABEL} (First attempt)')
                 print(f'Retrying ping to {tgt}...')
-                r = run_cmd(['ping', '-c', '3', '-I', ip_addr, tgt], capture_output=True)  # Try with more pings
-                result = r.returncode == 0
-            
-            print(f'Ping {tgt} from {ip_addr}: ' + (GREEN+'Success'+RESET if result else RED+'Fail{RESET} (After retry)'))
-            test_results.append((f'Initial Ping Custom DNS {tgt} from {ip_addr}', result))
+            print(f'Ping {tgt} from {ip_addr}: ' + (OK_LABEL if result else FAIL_LABEL+' (After retry)'))
+            test_results[f'Initial Ping Custom DNS {tgt} from {ip_addr}'] = result
             custom_ping_ok |= result
         
         # Update ping_ok to include custom DNS server ping results
@@ -1090,26 +1982,20 @@ def run_tests(iface, ip_addr, mgmt1, client_subnet, dhcp_servers, radius_servers
 
     print(f'\nInitial DNS Tests from {ip_addr} (@ ' + ', '.join(dns_servers) + '):')
     for d in dns_servers:
-        r = run_cmd(['dig', f'@{d}', '-b', ip_addr, 'www.google.com', '+short'], capture_output=True, text=True)
-        ok = (r.returncode==0 and bool(r.stdout.strip()))
-        print(f'DNS @{d} from {ip_addr}: ' + (GREEN+'Success'+RESET if ok else RED+'Fail'+RESET))
-        test_results.append((f'Initial DNS @{d} from {ip_addr}', ok))
+        ok = probes[d]['dig_ok']
+        print(f'DNS @{d} from {ip_addr}: ' + (OK_LABEL if ok else FAIL_LABEL))
+        test_results[f'Initial DNS @{d} from {ip_addr}'] = ok
 
     # Custom DNS tests from iface interface if provided
     if custom_dns_servers:
         print(f'\n=== Custom DNS tests from {ip_addr} ===')
         for d in custom_dns_servers:
-            r = run_cmd(['dig', f'@{d}', '-b', ip_addr, 'www.google.com', '+short'], capture_output=True, text=True)
-            ok = (r.returncode==0 and bool(r.stdout.strip()))
-            print(f'Custom DNS @{d} from {ip_addr}: ' + (GREEN+'Success'+RESET if ok else RED+'Fail'+RESET))
-            test_results.append((f'Custom DNS @{d} from {ip_addr}', ok))
+            ok = probes[d]['dig_ok']
+            print(f'Custom DNS @{d} from {ip_addr}: ' + (OK_LABEL if ok else FAIL_LABEL))
+            test_results[f'Custom DNS @{d} from {ip_addr}'] = ok
         
         # If custom DNS servers are provided and successful, use them
-        successful_custom_dns = []
-        for d in custom_dns_servers:
-            r = run_cmd(['dig', f'@{d}', '-b', ip_addr, 'www.google.com', '+short'], capture_output=True, text=True)
-            if r.returncode == 0 and bool(r.stdout.strip()):
-                successful_custom_dns.append(d)
+        successful_custom_dns = [d for d in custom_dns_servers if probes[d]['dig_ok']]
         
         if successful_custom_dns:
             print(f"\nUsing successful custom DNS servers: {', '.join(successful_custom_dns)}")
@@ -1140,7 +2026,7 @@ def run_tests(iface, ip_addr, mgmt1, client_subnet, dhcp_servers, radius_servers
     print(f'\nFull Test Suite:')
     
     # Get the IP address of the mgmt1 dummy loopback interface
-    mgmt1_ip = str(ipaddress.IPv4Network(mgmt1).network_address+1)
+    mgmt1_ip, _ = subnet_first_host(mgmt1)
     print(f"Using mgmt1 dummy loopback interface with IP {mgmt1_ip} as source for tests")
     
     # Verify the dummy loopback interface is working properly with retry logic
@@ -1153,15 +2039,14 @@ def run_tests(iface, ip_addr, mgmt1, client_subnet, dhcp_servers, radius_servers
     for attempt in range(max_retries):
         if DEBUG:
             print(f"Attempt {attempt+1}/{max_retries}: Testing connectivity from {mgmt1_ip}...")
-        ping_result = run_cmd(['ping', '-c', '2', '-I', mgmt1_ip, tgt], capture_output=True)
-        if ping_result.returncode == 0:
+        if ping_host(initial_targets[-1], mgmt1_ip, count=2):
             if DEBUG:
-                print(f"Connectivity from {mgmt1_ip}: {GREEN}Success{RESET}")
+                print(f"Connectivity from {mgmt1_ip}: {OK_LABEL}")
             loopback_working = True
             break
         else:
             if DEBUG:
-                print(f"Connectivity from {mgmt1_ip}: {RED}Fail{RESET}")
+                print(f"Connectivity from {mgmt1_ip}: {FAIL_LABEL}")
                 print(f"Waiting {retry_delay} seconds before retrying...")
             time.sleep(retry_delay)
     
@@ -1171,27 +2056,34 @@ def run_tests(iface, ip_addr, mgmt1, client_subnet, dhcp_servers, radius_servers
         print(f"{RED}Terminating tests...{RESET}")
         return test_results  # Return early with the tests we've done so far
 
+    # Run the ping and DNS probes from mgmt1 concurrently
+    with ThreadPoolExecutor(max_workers=len(dns_servers)) as ex:
+        dig_futures = [ex.submit(dig_probe, d, mgmt1_ip) for d in dns_servers]
+        replied = icmp_ping(dns_servers, mgmt1_ip, count=4)
+        ping_results = [tgt in replied for tgt in dns_servers]
+        dig_results = [f.result() for f in dig_futures]
+    
     # Ping tests
     print(f'\n=== Ping tests ===')
-    for tgt in dns_servers:
-        r = run_cmd(['ping', '-c', '4', '-I', mgmt1_ip, tgt], capture_output=True, text=True)
-        result = r.returncode == 0
-        print(f'Ping {tgt} from {mgmt1_ip}: ' + (GREEN+'Success'+RESET if result else RED+'Fail'+RESET))
-        test_results.append((f'Ping {tgt} from {mgmt1_ip}', result))
+    for tgt, result in zip(dns_servers, ping_results):
+        print(f'Ping {tgt} from {mgmt1_ip}: ' + (OK_LABEL if result else FAIL_LABEL))
+        test_results[f'Ping {tgt} from {mgmt1_ip}'] = result
     
     # DNS tests
     print(f'\n=== DNS tests ===')
-    for d in dns_servers:
-        r = run_cmd(['dig', f'@{d}', '-b', mgmt1_ip, 'www.google.com', '+short'], capture_output=True, text=True)
-        ok = (r.returncode==0 and bool(r.stdout.strip()))
-        print(f'DNS @{d} from {mgmt1_ip}: ' + (GREEN+'Success'+RESET if ok else RED+'Fail'+RESET))
-        test_results.append((f'DNS @{d} from {mgmt1_ip}', ok))
+    for d, ok in zip(dns_servers, dig_results):
+        print(f'DNS @{d} from {mgmt1_ip}: ' + (OK_LABEL if ok else FAIL_LABEL))
+        test_results[f'DNS @{d} from {mgmt1_ip}'] = ok
     
     # DHCP relay with ping pre-check - using dhcppython library
     if run_dhcp:
+        import dhcppython.client as dhcp_client
+        import dhcppython.options as dhcp_options
+        import dhcppython.utils as dhcp_utils
+        
         print(f'\n=== DHCP tests (L3 relay) ===')
         # Use the first IP of the client subnet as the helper IP (giaddr)
-        helper_ip = str(ipaddress.IPv4Network(client_subnet).network_address+1)
+        helper_ip, _ = subnet_first_host(client_subnet)
         print(f"Using client subnet first IP {helper_ip} as DHCP relay agent (giaddr)")
         
         # For the source IP, we should use the helper IP address (giaddr)
@@ -1200,499 +2092,261 @@ def run_tests(iface, ip_addr, mgmt1, client_subnet, dhcp_servers, radius_servers
         if DEBUG:
             print(f"Using helper IP {source_ip} as source IP for DHCP packets")
         
-        for srv in dhcp_servers:
-            p = run_cmd(['ping', '-c', '5', srv], capture_output=True)
-            if p.returncode != 0:
-                result = False
-                print(f'DHCP relay to {srv}: {RED}Fail (unreachable){RESET}')
-                test_results.append((f'DHCP relay to {srv}', result))
-                continue
-            
-            # Get the MAC address for the main interface (macOS way)
-            iface_mac = None
-            try:
-                ifconfig_out = run_cmd(['ifconfig', iface], capture_output=True, text=True, check=True).stdout
-                match = re.search(r'ether\s+([0-9a-fA-F:]{17})', ifconfig_out)
-                if match:
-                    iface_mac = match.group(1)
-                    if DEBUG: print(f"  Found MAC {iface_mac} for {iface}")
-            except subprocess.CalledProcessError as e:
-                if DEBUG: print(f"  Error getting MAC for {iface}: {e.stderr}")
-            except Exception as e_gen:
-                 if DEBUG: print(f"  Unexpected error getting MAC for {iface}: {e_gen}")
-
-            if not iface_mac:
-                print(f"Warning: Could not determine MAC address for {iface} using ifconfig, using random MAC")
-                iface_mac = dhcp_utils.random_mac()
-                
-            # Create a random client MAC address
-            client_mac = dhcp_utils.random_mac()
-            
-            # Using dhcppython for DHCP testing
-
-            if DEBUG:
-                print(f"DHCP Test Details:")
-                print(f"  Interface: {iface} (MAC: {iface_mac})")
-                print(f"  Source IP: {source_ip}")
-                print(f"  Destination IP: {srv}")
-                print(f"  Client MAC: {client_mac}")
-            
+        # Get the MAC address for the main interface once; it does not change per server
+        iface_mac_addr = iface_mac(iface)
+        if iface_mac_addr:
+            if DEBUG: print(f"  Found MAC {iface_mac_addr} for {iface}")
+        else:
+            print(f"Warning: Could not determine MAC address for {iface}, using random MAC")
+            iface_mac_addr = dhcp_utils.random_mac()
+        
+        # Ping all DHCP servers at once before testing them
+        reachable_dhcp = icmp_ping(dhcp_servers, count=5)
+        
+        # Create a random client MAC address per server; captured OFFERs are
+        # matched back to their server by it
+        client_macs = {srv: dhcp_utils.random_mac() for srv in dhcp_servers if srv in reachable_dhcp}
+        # Result message per server, filled in by whichever method gets an answer
+        dhcp_status = {}
+        
+        # Set up capture timeout
+        sniff_timeout = 10  # seconds
+        
+        if client_macs:
             try:
-                # Create DHCP client using the main interface
-                if DEBUG:
-                    print(f"Creating DHCP client on {iface} interface...")
-                c = dhcp_client.DHCPClient(
-                    interface=iface,      # Main test interface (e.g., en0), used for MAC lookup etc.
-                    send_from_port=67,    # Source port for outgoing DHCP Discover packets (as a relay)
-                    send_to_port=67       # Destination port on the DHCP server
-                )
-                
-                if DEBUG:
-                    print(f"  Using helper IP {helper_ip} as relay address in DHCP request")
-                
-                # Create a list of DHCP options
+                # Open one capture socket for all servers before sending anything;
+                # the kernel queues matching DHCP replies on it while dhcppython runs
                 if DEBUG:
-                    print(f"Setting up DHCP options...")
-                options_list = dhcp_options.OptionList([
-                    # Add standard options
-                    dhcp_options.options.short_value_to_object(60, "nile-readiness-test"),  # Class identifier
-                    dhcp_options.options.short_value_to_object(12, socket.gethostname()),   # Hostname
-                    # Parameter request list - request common options
-                    dhcp_options.options.short_value_to_object(55, [1, 3, 6, 15, 26, 28, 51, 58, 59, 43])
-                ])
+                    print("  Starting packet capture for DHCP OFFER...")
                 
-                if DEBUG:
-                    print(f"Attempting to get DHCP lease from {srv}...")
-                # Set broadcast=False for unicast to specific server
-                # Set server to the DHCP server IP
-                try:
-                    # Flag to track if we received an OFFER
-                    offer_received = False
-                    
-                    # Function to process DHCP packets
-                    def dhcp_callback(pkt):
-                        nonlocal offer_received
-                        # Check for UDP traffic on DHCP ports (67, 68)
-                        # Note: In relay scenarios, server may send to port 67 (relay port)
-                        if UDP in pkt and (pkt[UDP].dport == 67 or pkt[UDP].dport == 68 or 
-                                          pkt[UDP].sport == 67 or pkt[UDP].sport == 68):
-                            if DEBUG:
-                                print("  [Scapy Sniffer] Detected UDP packet on DHCP ports")
-                                print(f"  [Scapy Sniffer] Source: {pkt[IP].src}:{pkt[UDP].sport} -> Dest: {pkt[IP].dst}:{pkt[UDP].dport}")
-                            
-                            # Look for BOOTP/DHCP packets
-                            if BOOTP in pkt:
-                                if DEBUG:
-                                    print("  [Scapy Sniffer] Detected BOOTP packet")
-                                    print(f"  [Scapy Sniffer] BOOTP details:")
-                                    print(f"    Your IP: {pkt[BOOTP].yiaddr}")
-                                    print(f"    Server IP: {pkt[BOOTP].siaddr}")
-                                    print(f"    Gateway: {pkt[BOOTP].giaddr}")
-                                
-                                # Check if this is a DHCP packet with options
-                                if DHCP in pkt:
-                                    if DEBUG:
-                                        print("  [Scapy Sniffer] Detected DHCP options")
-                                    
-                                    # Look for DHCP message type option (53)
-                                    for opt in pkt[DHCP].options:
-                                        if isinstance(opt, tuple) and len(opt) >= 2:
-                                            if opt[0] == 'message-type':
-                                                if DEBUG:
-                                                    print(f"  [Scapy Sniffer] DHCP message type: {opt[1]}")
-                                                
-                                                # Check if it's an OFFER (type 2)
-                                                if opt[1] == 2:  # OFFER
-                                                    if DEBUG:
-                                                        print("  [Scapy Sniffer] Found DHCP OFFER!")
-                                                        print(f"  [Scapy Sniffer] DHCP OFFER details:")
-                                                        print(f"    Your IP: {pkt[BOOTP].yiaddr}")
-                                                        print(f"    Server IP: {pkt[BOOTP].siaddr}")
-                                                        print(f"    Gateway: {pkt[BOOTP].giaddr}")
-                                                        print(f"    Source: {pkt[IP].src}:{pkt[UDP].sport}")
-                                                        print(f"    Destination: {pkt[IP].dst}:{pkt[UDP].dport}")
-                                                    offer_received = True
-                                                    return None
-                        # Return None instead of False to prevent printing
-                        return None
-                    
-                    # Start sniffing in a separate thread
-                    if DEBUG:
-                        print("  Starting packet capture for DHCP OFFER...")
-                    
-                    # Set up sniffing timeout
-                    sniff_timeout = 10  # seconds
-                    
-                    # Start sniffing before sending the DHCP request
-                    sniff_thread = threading.Thread(
-                        target=lambda: sniff(
-                            iface=iface, 
-                            filter="udp and (port 67 or port 68)", 
-                            prn=dhcp_callback, 
-                            stop_filter=lambda p: offer_received, 
-                            timeout=sniff_timeout
-                        )
-                    )
-                    sniff_thread.daemon = True
-                    sniff_thread.start()
-                    
-                    # Wait a moment for sniffing to start
-                    time.sleep(0.5)
-                    
-                    # Now try to get a lease using dhcppython
+                with open_dhcp_capture(iface) as capture_sock:
+                    # Create a list of DHCP options
                     if DEBUG:
-                        print("  Sending DHCP request using dhcppython...")
+                        print(f"Setting up DHCP options...")
+                    options_list = dhcp_options.OptionList([
+                        # Add standard options
+                        dhcp_options.options.short_value_to_object(60, "nile-readiness-test"),  # Class identifier
+                        dhcp_options.options.short_value_to_object(12, LOCAL_HOSTNAME),   # Hostname
+                        # Parameter request list - request common options
+                        dhcp_options.options.short_value_to_object(55, [1, 3, 6, 15, 26, 28, 51, 58, 59, 43])
+                    ])
                     
-                    try:
-                        lease = c.get_lease(
-                            client_mac,
-                            broadcast=False,
-                            options_list=options_list,
-                            server=srv,
-                            relay=helper_ip
-                        )
-                        
-                        # If we get here, we got a lease with dhcppython
-                        if DEBUG:
-                            print(f"\nSuccessfully obtained DHCP lease with dhcppython!")
-                            print(f"DEBUG: Lease details:")
-                            print(f"  Your IP: {lease.ack.yiaddr}")
-                            print(f"  Server IP: {lease.ack.siaddr}")
-                            print(f"  Gateway: {lease.ack.giaddr}")
-                            print(f"  Options: {lease.ack.options}")
-                        
-                        result = True
-                        print(f'DHCP relay to {srv}: ' + GREEN+'Success (dhcppython)'+RESET)
-                        test_results.append((f'DHCP relay to {srv}', result))
-                    except Exception as e:
+                    for srv, client_mac in client_macs.items():
                         if DEBUG:
-                            print(f"Error during DHCP lease request with dhcppython: {e}")
-                            import traceback
-                            traceback.print_exc()
-                        # In non-debug mode, don't print anything about fallback methods
+                            print(f"DHCP Test Details:")
+                            print(f"  Interface: {iface} (MAC: {iface_mac_addr})")
+                            print(f"  Source IP: {source_ip}")
+                            print(f"  Destination IP: {srv}")
+                            print(f"  Client MAC: {client_mac}")
                         
-                        # Wait for the sniffing thread to complete
-                        sniff_thread.join()
-                        
-                        # Check if we received an OFFER via packet sniffing
-                        if offer_received:
-                            result = True
-                            print(f'DHCP relay to {srv}: ' + GREEN+'Success (OFFER detected)'+RESET)
-                            test_results.append((f'DHCP relay to {srv}', result))
-                        else:
-                            # If no OFFER was detected with packet sniffing either, try a direct approach
+                        # OFFERs for this server are collected until the end of its capture window
+                        capture_deadline = time.monotonic() + sniff_timeout
+                        try:
+                            # Create DHCP client using the main interface
                             if DEBUG:
-                                print("  Attempting direct DHCP DISCOVER...")
-                            
-                            # Generate a random transaction ID
-                            xid = random.randint(1, 0xFFFFFFFF)
-                            
-                            # Parse MAC address
-                            mac_bytes = bytes.fromhex(client_mac.replace(':', ''))
-                            
-                            # Create and send DHCP DISCOVER packet
-                            dhcp_discover = (Ether(dst="ff:ff:ff:ff:ff:ff", src=client_mac) /
-                                            IP(src="0.0.0.0", dst="255.255.255.255") /
-                                            UDP(sport=68, dport=67) /
-                                            BOOTP(chaddr=mac_bytes, xid=xid, flags=0x8000) /
-                                            DHCP(options=[("message-type", "discover"), "end"]))
-                            
-                            # Reset the offer_received flag
-                            offer_received = False
-                            
-                            # Start a new sniffing thread
-                            sniff_thread = threading.Thread(
-                                target=lambda: sniff(
-                                    iface=iface, 
-                                    filter="udp and (port 67 or port 68)", 
-                                    prn=dhcp_callback, 
-                                    stop_filter=lambda p: offer_received, 
-                                    timeout=sniff_timeout
-                                )
+                                print(f"Creating DHCP client on {iface} interface...")
+                            c = dhcp_client.DHCPClient(
+                                interface=iface,      # Main test interface (e.g., en0), used for MAC lookup etc.
+                                send_from_port=67,    # Source port for outgoing DHCP Discover packets (as a relay)
+                                send_to_port=67       # Destination port on the DHCP server
                             )
-                            sniff_thread.daemon = True
-                            sniff_thread.start()
                             
-                            # Wait a moment for sniffing to start
-                            time.sleep(0.5)
-                            
-                            # Send the packet
+                            # Set broadcast=False for unicast to specific server
+                            # Set server to the DHCP server IP
                             if DEBUG:
-                                print("  Sending DHCP DISCOVER packet with scapy...")
-                            sendp(dhcp_discover, iface=iface, verbose=0)
-                            
-                            # Wait for sniffing to complete
-                            sniff_thread.join()
+                                print(f"  Using helper IP {helper_ip} as relay address in DHCP request")
+                                print(f"Attempting to get DHCP lease from {srv}...")
+                            lease = c.get_lease(
+                                client_mac,
+                                broadcast=False,
+                                options_list=options_list,
+                                server=srv,
+                                relay=helper_ip
+                            )
                             
-                            # Check the result
-                            if offer_received:
-                                result = True
-                                print(f'DHCP relay to {srv}: ' + GREEN+'Success (OFFER received)'+RESET)
-                                test_results.append((f'DHCP relay to {srv}', result))
-                            else:
-                                result = False
-                                print(f'DHCP relay to {srv}: ' + RED+'Fail (no DHCP OFFER detected)'+RESET)
-                                test_results.append((f'DHCP relay to {srv}', result))
-                except Exception as e:
-                    print(f"Error during DHCP test: {e}")
-                    if DEBUG:
-                        import traceback
-                        traceback.print_exc()
-                    result = False
-                    print(f'DHCP relay to {srv}: ' + RED+'Fail'+RESET)
-                    test_results.append((f'DHCP relay to {srv}', result))
-                
-                
+                            # If we get here, we got a lease with dhcppython
+                            if DEBUG:
+                                print(f"\nSuccessfully obtained DHCP lease with dhcppython!")
+                                print(f"DEBUG: Lease details:")
+                                print(f"  Your IP: {lease.ack.yiaddr}")
+                                print(f"  Server IP: {lease.ack.siaddr}")
+                                print(f"  Gateway: {lease.ack.giaddr}")
+                                print(f"  Options: {lease.ack.options}")
+                            dhcp_status[srv] = 'Success (dhcppython)'
+                        except Exception as e:
+                            if DEBUG:
+                                print(f"Error during DHCP lease request with dhcppython: {e}")
+                                traceback.print_exc()
+                            # In non-debug mode, don't print anything about fallback methods
+                    
+                    # Check if OFFERs were captured for the servers dhcppython got no lease
+                    # from, waiting out the rest of the last capture window once for all of them
+                    pending = {client_macs[srv]: srv for srv in client_macs if srv not in dhcp_status}
+                    if pending:
+                        offers = wait_for_dhcp_offers(capture_sock, pending, capture_deadline - time.monotonic())
+                        for client_mac in offers:
+                            dhcp_status[pending.pop(client_mac)] = 'Success (OFFER detected)'
+                    
+                    # If no OFFER was detected with packet capture either, try a direct
+                    # approach: send all remaining DISCOVERs at once and wait one window
+                    if pending:
+                        if DEBUG:
+                            print("  Attempting direct DHCP DISCOVER...")
+                            print("  Sending DHCP DISCOVER packets on the capture socket...")
+                        for client_mac in pending:
+                            # Generate a random transaction ID
+                            xid = random.randint(1, 0xFFFFFFFF)
+                            capture_sock.send(build_dhcp_discover(client_mac, xid))
+                        offers = wait_for_dhcp_offers(capture_sock, pending, sniff_timeout)
+                        for client_mac in offers:
+                            dhcp_status[pending.pop(client_mac)] = 'Success (OFFER received)'
             except Exception as e:
                 print(f"Error during DHCP test: {e}")
                 if DEBUG:
-                    import traceback
                     traceback.print_exc()
-                result = False
-                print(f'DHCP relay to {srv}: ' + RED+'Fail'+RESET)
-                test_results.append((f'DHCP relay to {srv}', result))
+                for srv in client_macs:
+                    dhcp_status.setdefault(srv, 'Fail')
+        
+        for srv in dhcp_servers:
+            if srv not in reachable_dhcp:
+                status = 'Fail (unreachable)'
+            else:
+                status = dhcp_status.get(srv, 'Fail (no DHCP OFFER detected)')
+            result = status.startswith('Success')
+            print(f'DHCP relay to {srv}: ' + (GREEN if result else RED) + status + RESET)
+            test_results[f'DHCP relay to {srv}'] = result
     else:
         print('\nSkipping DHCP tests')
 
-    # RADIUS with ping pre-check
+    # The RADIUS, NTP, HTTPS, SSL certificate and guest UDP probes are
+    # independent network waits, so run them all concurrently and print the
+    # results afterwards in the usual order
+    default_ntp_servers = ('time.google.com', 'pool.ntp.org')
+    with ThreadPoolExecutor(max_workers=32) as ex:
+        ntp_futures = {(src, ntp): ex.submit(ntp_probe, src, ntp)
+                       for src in (ip_addr, mgmt1_ip)
+                       for ntp in default_ntp_servers + tuple(custom_ntp_servers)}
+        # One TLS connection per URL and source gives reachability, HTTP status
+        # and the certificate check together
+        https_futures = {(src, url): ex.submit(https_check, src, url, org)
+                         for url, org in ((NILE_URL, "Nile Global Inc."), (S3_URL, "Amazon"), (NILESECURE_URL, None))
+                         for src in (ip_addr, mgmt1_ip)}
+        udp_futures = [ex.submit(check_udp_connectivity, ip, UDP_PORT) for ip in GUEST_IPS]
+        
+        # RADIUS with ping pre-check
+        radius_futures = {}
+        if run_radius:
+            reachable_radius = icmp_ping(radius_servers)
+            radius_futures = {srv: ex.submit(radius_probe, srv, user, pwd, secret)
+                              for srv in radius_servers if srv in reachable_radius}
+    
     if run_radius:
         print(f'\n=== RADIUS tests ===')
         for srv in radius_servers:
-            p = run_cmd(['ping', '-c', '1', srv], capture_output=True)
-            if p.returncode != 0:
+            if srv not in radius_futures:
                 result = False
                 print(f'RADIUS {srv}: {RED}Fail (unreachable){RESET}')
-                test_results.append((f'RADIUS {srv}', result))
+                test_results[f'RADIUS {srv}'] = result
                 continue
-            cmd = (f'echo "User-Name={user},User-Password={pwd}" '
-                  f'| radclient -x -s {srv}:1812 auth {secret}')
-            res = run_cmd(cmd, shell=True, capture_output=True, text=True)
-            result = res.returncode == 0
-            print(f'RADIUS {srv}: ' + (GREEN+'Success'+RESET if result else RED+'Fail'+RESET))
-            test_results.append((f'RADIUS {srv}', result))
+            result = radius_futures[srv].result()
+            print(f'RADIUS {srv}: ' + (OK_LABEL if result else FAIL_LABEL))
+            test_results[f'RADIUS {srv}'] = result
     else:
         print('\nSkipping RADIUS tests')
 
-    # NTP tests from main interface
-    print(f'\n=== NTP tests from main interface ({ip_addr}) ===')
-    # Test default NTP servers
-    for ntp in ('time.google.com', 'pool.ntp.org'):
-        r = run_cmd(['ntpdate', '-q', '-b', ip_addr, ntp], capture_output=True, text=True)
-        result = r.returncode == 0
-        print(f'NTP {ntp} from {ip_addr}: ' + (GREEN+'Success'+RESET if result else RED+'Fail'+RESET))
-        test_results.append((f'NTP {ntp} from {ip_addr}', result))
-    
-    # Test custom NTP servers if provided
-    if custom_ntp_servers:
-        print(f'\n=== Custom NTP tests from main interface ({ip_addr}) ===')
-        for ntp in custom_ntp_servers:
-            r = run_cmd(['ntpdate', '-q', '-b', ip_addr, ntp], capture_output=True, text=True)
-            result = r.returncode == 0
-            print(f'Custom NTP {ntp} from {ip_addr}: ' + (GREEN+'Success'+RESET if result else RED+'Fail'+RESET))
-            test_results.append((f'Custom NTP {ntp} from {ip_addr}', result))
-    
-    # NTP tests from mgmt1
-    print(f'\n=== NTP tests from mgmt1 ({mgmt1_ip}) ===')
-    # Test default NTP servers
-    for ntp in ('time.google.com', 'pool.ntp.org'):
-        r = run_cmd(['ntpdate', '-q', '-b', mgmt1_ip, ntp], capture_output=True, text=True)
-        result = r.returncode == 0
-        print(f'NTP {ntp} from {mgmt1_ip}: ' + (GREEN+'Success'+RESET if result else RED+'Fail'+RESET))
-        test_results.append((f'NTP {ntp} from {mgmt1_ip}', result))
-    
-    # Test custom NTP servers if provided
-    if custom_ntp_servers:
-        print(f'\n=== Custom NTP tests from mgmt1 ({mgmt1_ip}) ===')
-        for ntp in custom_ntp_servers:
-            r = run_cmd(['ntpdate', '-q', '-b', mgmt1_ip, ntp], capture_output=True, text=True)
-            result = r.returncode == 0
-            print(f'Custom NTP {ntp} from {mgmt1_ip}: ' + (GREEN+'Success'+RESET if result else RED+'Fail'+RESET))
-            test_results.append((f'Custom NTP {ntp} from {mgmt1_ip}', result))
+    # NTP tests from the main interface and from mgmt1
+    for src, label in ((ip_addr, 'main interface'), (mgmt1_ip, 'mgmt1')):
+        print(f'\n=== NTP tests from {label} ({src}) ===')
+        # Test default NTP servers
+        for ntp in default_ntp_servers:
+            result = ntp_futures[(src, ntp)].result()
+            print(f'NTP {ntp} from {src}: ' + (OK_LABEL if result else FAIL_LABEL))
+            test_results[f'NTP {ntp} from {src}'] = result
+        
+        # Test custom NTP servers if provided
+        if custom_ntp_servers:
+            print(f'\n=== Custom NTP tests from {label} ({src}) ===')
+            for ntp in custom_ntp_servers:
+                result = ntp_futures[(src, ntp)].result()
+                print(f'Custom NTP {ntp} from {src}: ' + (OK_LABEL if result else FAIL_LABEL))
+                test_results[f'Custom NTP {ntp} from {src}'] = result
 
     # HTTPS and SSL Certificate tests
     print(f'\n=== HTTPS and SSL Certificate tests ===')
     
-    # Test HTTPS connectivity and SSL certificates for Nile Cloud from main interface
-    print(f'Testing HTTPS for {NILE_HOSTNAME} from {ip_addr}...')
-    parsed = urlparse(f'https://{NILE_HOSTNAME}')
-    host, port = parsed.hostname, parsed.port or 443
-    try:
-        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        sock.bind((ip_addr, 0))  # Bind to ip_addr with a random port
-        sock.connect((host, port))
-        sock.close()
-        https_ok = True
-        print(f'HTTPS {NILE_HOSTNAME} from {ip_addr}: {GREEN}Success{RESET}')
-    except Exception as e:
-        https_ok = False
-        if DEBUG:
-            print(f'HTTPS {NILE_HOSTNAME} from {ip_addr}: {RED}Fail{RESET} ({e})')
-        else:
-            print(f'HTTPS {NILE_HOSTNAME} from {ip_addr}: {RED}Fail{RESET}')
-    test_results.append((f'HTTPS {NILE_HOSTNAME} from {ip_addr}', https_ok))
-    
-    # Test HTTPS connectivity and SSL certificates for Nile Cloud from mgmt1
-    print(f'\nTesting HTTPS for {NILE_HOSTNAME} from {mgmt1_ip}...')
-    parsed = urlparse(f'https://{NILE_HOSTNAME}')
-    host, port = parsed.hostname, parsed.port or 443
-    try:
-        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        sock.bind((mgmt1_ip, 0))  # Bind to mgmt1_ip with a random port
-        sock.connect((host, port))
-        sock.close()
-        https_ok = True
-        print(f'HTTPS {NILE_HOSTNAME} from {mgmt1_ip}: {GREEN}Success{RESET}')
-    except Exception as e:
-        https_ok = False
-        if DEBUG:
-            print(f'HTTPS {NILE_HOSTNAME} from {mgmt1_ip}: {RED}Fail{RESET} ({e})')
+    # Test HTTPS connectivity for Nile Cloud from the main interface and mgmt1
+    for lead, src in (('', ip_addr), ('\n', mgmt1_ip)):
+        print(f'{lead}Testing HTTPS for {NILE_HOSTNAME} from {src}...')
+        check = https_futures[(src, NILE_URL)].result()
+        https_ok = check['connected']
+        if https_ok:
+            print(f'HTTPS {NILE_HOSTNAME} from {src}: {OK_LABEL}')
+        elif DEBUG:
+            print(f'HTTPS {NILE_HOSTNAME} from {src}: {FAIL_LABEL} ({check["error"]})')
         else:
-            print(f'HTTPS {NILE_HOSTNAME} from {mgmt1_ip}: {RED}Fail{RESET}')
-    test_results.append((f'HTTPS {NILE_HOSTNAME} from {mgmt1_ip}', https_ok))
-    
-    # Now check the SSL certificate
-    print(f'\nChecking SSL certificate for {NILE_HOSTNAME}...')
-    # Use dig to resolve the hostname to IP addresses
-    r = run_cmd(['dig', NILE_HOSTNAME, '+short'], capture_output=True, text=True)
-    if r.returncode == 0 and r.stdout.strip():
-        nile_ips = r.stdout.strip().split('\n')
-        print(f"\nResolved {NILE_HOSTNAME} to: {', '.join(nile_ips)}")
-        nile_ssl_success = False
-        for ip in nile_ips:
-            if check_ssl_certificate(ip, NILE_HOSTNAME, "Nile Global Inc."):
-                nile_ssl_success = True
-                print(f"SSL certificate for {NILE_HOSTNAME}: {GREEN}Success{RESET}")
-                break
+            print(f'HTTPS {NILE_HOSTNAME} from {src}: {FAIL_LABEL}')
+        test_results[f'HTTPS {NILE_HOSTNAME} from {src}'] = https_ok
+    
+    def report_ssl(hostname, url):
+        print(f'\nChecking SSL certificate for {hostname}...')
+        checks = {src: https_futures[(src, url)].result() for src in (ip_addr, mgmt1_ip)}
+        if not any(check['connected'] for check in checks.values()):
+            print(f"Could not connect to {hostname} for SSL check")
+            test_results[f"SSL Certificate for {hostname}"] = False
+            return
+        for src, check in checks.items():
+            if check['connected'] and not check['cert_ok']:
+                print(f"SSL certificate for {hostname} (from {src}): {FAIL_LABEL}")
+        ssl_success = any(check['cert_ok'] for check in checks.values())
+        if ssl_success:
+            print(f"SSL certificate for {hostname}: {OK_LABEL}")
+        test_results[f"SSL Certificate for {hostname}"] = ssl_success
+    
+    def report_https(name, url):
+        for src in (ip_addr, mgmt1_ip):
+            print(f'\nTesting HTTPS for {name} from {src}...')
+            check = https_futures[(src, url)].result()
+            status = check['status']
+            # For HTTPS tests, consider 2xx and 3xx as success (redirects are common)
+            https_ok = status.startswith('2') or status.startswith('3')
+            if https_ok:
+                print(f'HTTPS {name} from {src}: {OK_LABEL} (Status: {status})')
             else:
-                print(f"SSL certificate for {NILE_HOSTNAME} (IP: {ip}): {RED}Fail{RESET}")
-        test_results.append((f"SSL Certificate for {NILE_HOSTNAME}", nile_ssl_success))
-    else:
-        print(f"Could not resolve {NILE_HOSTNAME} for SSL check")
-        test_results.append((f"SSL Certificate for {NILE_HOSTNAME}", False))
-    
-    # Test HTTPS connectivity and SSL certificates for Amazon S3 from main interface
-    print(f'\nTesting HTTPS for {S3_HOSTNAME} from {ip_addr}...')
-    r = run_cmd(['curl', '-s', '-o', '/dev/null', '-w', '%{http_code}', 
-                 '--connect-timeout', '10', '--interface', ip_addr,
-                 '-A', 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-                 '-H', 'Accept: text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-                 '-H', 'Accept-Language: en-US,en;q=0.5',
-                 f'https://{S3_HOSTNAME}/nile-prod-us-west-2'], capture_output=True, text=True)
-    # For HTTPS tests, consider 2xx and 3xx as success (redirects are common)
-    https_ok = r.returncode == 0 and (r.stdout.strip().startswith('2') or r.stdout.strip().startswith('3'))
-    if https_ok:
-        print(f'HTTPS {S3_HOSTNAME} from {ip_addr}: {GREEN}Success{RESET} (Status: {r.stdout.strip()})')
-    else:
-        # For 403 errors, it's still a successful connection, just forbidden access
-        if r.stdout.strip() == '403':
-            print(f'HTTPS {S3_HOSTNAME} from {ip_addr}: {GREEN}Success{RESET} (Status: 403 Forbidden - connection successful but access denied)')
-            https_ok = True
-        else:
-            print(f'HTTPS {S3_HOSTNAME} from {ip_addr}: {RED}Fail{RESET} (Status: {r.stdout.strip() if r.stdout else "Connection failed"})')
-    test_results.append((f'HTTPS {S3_HOSTNAME} from {ip_addr}', https_ok))
-    
-    # Test HTTPS connectivity and SSL certificates for Amazon S3 from mgmt1
-    print(f'\nTesting HTTPS for {S3_HOSTNAME} from {mgmt1_ip}...')
-    r = run_cmd(['curl', '-s', '-o', '/dev/null', '-w', '%{http_code}', 
-                 '--connect-timeout', '10', '--interface', mgmt1_ip,
-                 '-A', 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-                 '-H', 'Accept: text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-                 '-H', 'Accept-Language: en-US,en;q=0.5',
-                 f'https://{S3_HOSTNAME}/nile-prod-us-west-2'], capture_output=True, text=True)
-    # For HTTPS tests, consider 2xx and 3xx as success (redirects are common)
-    https_ok = r.returncode == 0 and (r.stdout.strip().startswith('2') or r.stdout.strip().startswith('3'))
-    if https_ok:
-        print(f'HTTPS {S3_HOSTNAME} from {mgmt1_ip}: {GREEN}Success{RESET} (Status: {r.stdout.strip()})')
-    else:
-        # For 403 errors, it's still a successful connection, just forbidden access
-        if r.stdout.strip() == '403':
-            print(f'HTTPS {S3_HOSTNAME} from {mgmt1_ip}: {GREEN}Success{RESET} (Status: 403 Forbidden - connection successful but access denied)')
-            https_ok = True
-        else:
-            print(f'HTTPS {S3_HOSTNAME} from {mgmt1_ip}: {RED}Fail{RESET} (Status: {r.stdout.strip() if r.stdout else "Connection failed"})')
-    test_results.append((f'HTTPS {S3_HOSTNAME} from {mgmt1_ip}', https_ok))
+                # For 403 errors, it's still a successful connection, just forbidden access
+                if status == '403':
+                    print(f'HTTPS {name} from {src}: {OK_LABEL} (Status: 403 Forbidden - connection successful but access denied)')
+                    https_ok = True
+                else:
+                    print(f'HTTPS {name} from {src}: {FAIL_LABEL} (Status: {status if status else "Connection failed"})')
+            test_results[f'HTTPS {name} from {src}'] = https_ok
     
     # Now check the SSL certificate
-    print(f'\nChecking SSL certificate for {S3_HOSTNAME}...')
-    # Use dig to resolve the hostname to IP addresses
-    r = run_cmd(['dig', S3_HOSTNAME, '+short'], capture_output=True, text=True)
-    if r.returncode == 0 and r.stdout.strip():
-        s3_ips = r.stdout.strip().split('\n')
-        print(f"\nResolved {S3_HOSTNAME} to: {', '.join(s3_ips)}")
-        s3_ssl_success = False
-        # Only test the first 2 IPs for S3
-        for ip in s3_ips[:2]:
-            if check_ssl_certificate(ip, S3_HOSTNAME, "Amazon"):
-                s3_ssl_success = True
-                print(f"SSL certificate for {S3_HOSTNAME}: {GREEN}Success{RESET}")
-                break
-            else:
-                print(f"SSL certificate for {S3_HOSTNAME} (IP: {ip}): {RED}Fail{RESET}")
-        test_results.append((f"SSL Certificate for {S3_HOSTNAME}", s3_ssl_success))
-    else:
-        print(f"Could not resolve {S3_HOSTNAME} for SSL check")
-        test_results.append((f"SSL Certificate for {S3_HOSTNAME}", False))
-    
-    # Test HTTPS connectivity for Nile Secure from main interface
-    print(f'\nTesting HTTPS for u1.nilesecure.com from {ip_addr}...')
-    r = run_cmd(['curl', '-s', '-o', '/dev/null', '-w', '%{http_code}', 
-                 '--connect-timeout', '10', '--interface', ip_addr,
-                 '-A', 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-                 '-H', 'Accept: text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-                 '-H', 'Accept-Language: en-US,en;q=0.5',
-                 'https://u1.nilesecure.com'], capture_output=True, text=True)
-    # For HTTPS tests, consider 2xx and 3xx as success (redirects are common)
-    https_ok = r.returncode == 0 and (r.stdout.strip().startswith('2') or r.stdout.strip().startswith('3'))
-    if https_ok:
-        print(f'HTTPS u1.nilesecure.com from {ip_addr}: {GREEN}Success{RESET} (Status: {r.stdout.strip()})')
-    else:
-        # For 403 errors, it's still a successful connection, just forbidden access
-        if r.stdout.strip() == '403':
-            print(f'HTTPS u1.nilesecure.com from {ip_addr}: {GREEN}Success{RESET} (Status: 403 Forbidden - connection successful but access denied)')
-            https_ok = True
-        else:
-            print(f'HTTPS u1.nilesecure.com from {ip_addr}: {RED}Fail{RESET} (Status: {r.stdout.strip() if r.stdout else "Connection failed"})')
-    test_results.append((f'HTTPS u1.nilesecure.com from {ip_addr}', https_ok))
-    
-    # Test HTTPS connectivity for Nile Secure from mgmt1
-    print(f'\nTesting HTTPS for u1.nilesecure.com from {mgmt1_ip}...')
-    r = run_cmd(['curl', '-s', '-o', '/dev/null', '-w', '%{http_code}', 
-                 '--connect-timeout', '10', '--interface', mgmt1_ip,
-                 '-A', 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-                 '-H', 'Accept: text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-                 '-H', 'Accept-Language: en-US,en;q=0.5',
-                 'https://u1.nilesecure.com'], capture_output=True, text=True)
-    # For HTTPS tests, consider 2xx and 3xx as success (redirects are common)
-    https_ok = r.returncode == 0 and (r.stdout.strip().startswith('2') or r.stdout.strip().startswith('3'))
-    if https_ok:
-        print(f'HTTPS u1.nilesecure.com from {mgmt1_ip}: {GREEN}Success{RESET} (Status: {r.stdout.strip()})')
-    else:
-        # For 403 errors, it's still a successful connection, just forbidden access
-        if r.stdout.strip() == '403':
-            print(f'HTTPS u1.nilesecure.com from {mgmt1_ip}: {GREEN}Success{RESET} (Status: 403 Forbidden - connection successful but access denied)')
-            https_ok = True
-        else:
-            print(f'HTTPS u1.nilesecure.com from {mgmt1_ip}: {RED}Fail{RESET} (Status: {r.stdout.strip() if r.stdout else "Connection failed"})')
-    test_results.append((f'HTTPS u1.nilesecure.com from {mgmt1_ip}', https_ok))
+    report_ssl(NILE_HOSTNAME, NILE_URL)
+    
+    # Test HTTPS connectivity and SSL certificates for Amazon S3
+    report_https(S3_HOSTNAME, S3_URL)
+    report_ssl(S3_HOSTNAME, S3_URL)
+    
+    # Test HTTPS connectivity for Nile Secure
+    report_https(NILESECURE_URL.hostname, NILESECURE_URL)
     
     # UDP Connectivity Check for Guest Access
     print(f'\n=== UDP Connectivity Check for Guest Access ===')
-    guest_success = False
+    print(f"Testing UDP connectivity to {', '.join(GUEST_IPS)} on port {UDP_PORT}...")
     
-    for ip in GUEST_IPS:
-        print(f"Testing UDP connectivity to {ip}:{UDP_PORT}...")
-        if check_udp_connectivity_netcat(ip, UDP_PORT):
-            guest_success = True
-            print(f"UDP connectivity to {ip}:{UDP_PORT}: {GREEN}Success{RESET}")
-            break
-        else:
-            print(f"UDP connectivity to {ip}:{UDP_PORT}: {RED}Fail{RESET}")
+    udp_results = [f.result() for f in udp_futures]
+    for ip, ok in zip(GUEST_IPS, udp_results):
+        print(f"UDP connectivity to {ip}:{UDP_PORT}: " + (OK_LABEL if ok else FAIL_LABEL))
+    guest_success = any(udp_results)
     
-    test_results.append(("UDP Connectivity Check for Guest Access", guest_success))
+    test_results["UDP Connectivity Check for Guest Access"] = guest_success
     
     
     return test_results
 
+# Tests that are recorded but left out of the summary
+SUMMARY_EXCLUDED_TESTS = frozenset({"Static Default Route Configuration"})
+
 # Print test summary
 def print_test_summary(test_results):
     """
@@ -1704,21 +2358,18 @@ def print_test_summary(test_results):
     - Calculates and prints the overall success rate
     
     Args:
-        test_results: List of tuples containing test results (test_name, result)
+        test_results: Dictionary of test results keyed by test name
     """
     print("\n=== Test Summary ===")
     success_count = 0
     total_count = 0
     
-    # Filter out tests that shouldn't be included in the summary
-    excluded_tests = ["Static Default Route Configuration"]
-    
-    for test_name, result in test_results:
-        # Skip excluded tests
-        if test_name in excluded_tests:
+    for test_name, result in test_results.items():
+        # Skip tests that shouldn't be included in the summary
+        if test_name in SUMMARY_EXCLUDED_TESTS:
             continue
             
-        status = GREEN + "Success" + RESET if result else RED + "Fail" + RESET
+        status = OK_LABEL if result else FAIL_LABEL
         print(f"{test_name}: {status}")
         total_count += 1
         if result:
@@ -1772,34 +2423,46 @@ def main():
         # Configure the interface (includes validation and retry logic)
         interface_up = configure_interface(test_iface, ip_addr, netmask, mgmt_interface)
         
-        # Add loopbacks
-        add_loopbacks(mgmt1, mgmt2, client_subnet)
-        
-        # Configure static route and verify it was added successfully
-        prefix = ipaddress.IPv4Network(f'0.0.0.0/{netmask}').prefixlen
-        route_added = configure_static_route(gateway, test_iface)
-        
-        # Add the route status to the test results
-        test_results = []
-        test_results.append(("Static Default Route Configuration", route_added))
-
-        # Update scapy's routing table
-        conf.route.resync()
-        
-        # Sniff for OSPF Hello packets
-        up, area, hi, di = sniff_ospf_hello(test_iface)
+        # Sniff for OSPF Hello packets in the background while the rest of the
+        # host setup runs; the sniff only needs the test interface to be up.
+        # Writing to the stop pipe ends the sniff early if setup fails, so
+        # leaving the executor does not wait out the sniff timeout.
+        stop_r, stop_w = os.pipe()
+        try:
+            with ThreadPoolExecutor(max_workers=1) as ex:
+                hello = ex.submit(sniff_ospf_hello, test_iface, stop_fd=stop_r)
+                try:
+                    # Add loopbacks
+                    add_loopbacks(mgmt1, mgmt2, client_subnet)
+                    
+                    # Configure static route and verify it was added successfully
+                    prefix = netmask_to_prefix(netmask)
+                    route_added = configure_static_route(gateway, test_iface)
+                    
+                    # Add the route status to the test results
+                    test_results = {}
+                    test_results["Static Default Route Configuration"] = route_added
+                    
+                    # Wait for the OSPF Hello (re-raises SystemExit if none was received)
+                    up, area, hi, di = hello.result()
+                except BaseException:
+                    os.write(stop_w, b'\0')
+                    raise
+        finally:
+            os.close(stop_r)
+            os.close(stop_w)
         
         # Configure OSPF
         configure_ospf(test_iface, ip_addr, prefix, mgmt1, mgmt2, client_subnet, up, area, hi, di)
         
         # Check OSPF status
         ospf_ok = show_ospf_status()
-        print("OSPF adjacency test: " + (GREEN+'Success'+RESET if ospf_ok else RED+'Fail'+RESET))
+        print("OSPF adjacency test: " + (OK_LABEL if ospf_ok else FAIL_LABEL))
         
-        # Add OSPF test result to the test results list
-        test_results.append(("OSPF Adjacency Test", ospf_ok))
+        # Add OSPF test result to the test results
+        test_results["OSPF Adjacency Test"] = ospf_ok
 
-        # Run connectivity tests with the existing test_results list
+        # Run connectivity tests with the existing test_results
         test_results = run_tests(test_iface, ip_addr, mgmt1, client_subnet, dhcp_servers, radius_servers, secret, username, password, run_dhcp, run_radius, custom_dns_servers, custom_ntp_servers, test_results)
     
     finally:
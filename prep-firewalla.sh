@@ -16,7 +16,7 @@ sudo pip3 install dhcppython
 
 # Update package lists and install additional tools
 sudo apt update
-sudo apt install -y frr freeradius dnsutils ntpdate curl netcat-openbsd openssl
+sudo apt install -y frr freeradius dnsutils
 
 # Set nrt.py to be an executable
 sudo chmod +x nrt.py